@@ -0,0 +1,565 @@
+import argparse
+import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from datalosc.players import identity_members, member_sums, mode_value
+from datalosc.store import SEASONS, season_path
+
+STATIC_COLUMNS = ['Nationality', 'Team', 'League', 'Position', 'General Position', 'Age']
+NEGATIVE_STATS = [
+    'Yellow Cards', 'Red Cards', 'Second Yellow Cards',
+    'Fouls Committed', 'Offsides', 'Miscontrols', 'Dispossessed',
+    'Errors', 'Own Goals', 'Penalties Kicks Conceded', 'Challenges Lost',
+    'Ball Losses', 'Aerials Lost'
+]
+GOALKEEPER_NEGATIVE_STATS = [
+    'Goals Against'
+]
+TEAM_STATIC_COLUMNS = ['Matches Played', 'Average Age']
+TEAM_NEGATIVE_STATS = [
+    'Yellow Cards', 'Red Cards', 'Second Yellow Cards',
+    'Fouls Committed', 'Offsides', 'Miscontrols', 'Dispossessed',
+    'Errors', 'Own Goals', 'Penalties Conceded', 'Challenges Lost',
+    'Ball Losses', 'Aerial Duels Lost', 'Goals Against', 'Clean Sheets'
+]
+SCOUTING_STATIC_COLUMNS = ['Nation', 'Team', 'League', 'Position', 'General Position', 'Age']
+SCOUTING_GOALKEEPER_STATIC_COLUMNS = ['Nation', 'General Position', 'Team', 'Age', 'Born']
+SCOUTING_EXCLUDED_COLUMNS = ['Nation', 'General Position', 'Team', 'Age', 'Born', 'Matches Played', 'Starts', 'Minutes Played']
+
+
+# ------------------------- Season totals -------------------------
+def custom_agg(df):
+    df = df.drop(columns="Game Week", errors="ignore")
+
+    df_grouped = df.groupby(["Player", "Team"], as_index=False).agg({
+        "League": lambda x: sorted(list(set(x.dropna()))),
+        "Position": lambda x: x.mode().iloc[0] if not x.mode().empty else None,
+        "General Position": lambda x: x.mode().iloc[0] if not x.mode().empty else None,
+        "Age": "max",
+        "Nationality": 'first',
+        **{
+            col: 'sum'
+            for col in df.select_dtypes(include='number').columns
+            if col != "Age"
+        }
+    })
+
+    df_grouped = df_grouped.round(2)
+    df_grouped["Age"] = df_grouped["Age"].astype("Int64")
+    df_grouped["Minutes"] = df_grouped["Minutes"].astype("Int64")
+
+    return df_grouped
+
+def _leagues(entries):
+    leagues = set()
+    for league_entry in entries:
+        if isinstance(league_entry, list):
+            leagues.update(league_entry)
+        elif isinstance(league_entry, str) and league_entry.startswith("["):
+            try:
+                leagues.update(ast.literal_eval(league_entry))
+            except (ValueError, SyntaxError):
+                leagues.add(league_entry)
+        else:
+            leagues.add(league_entry)
+    return ', '.join(sorted(leagues))
+
+def merge_similar_players(df, max_age_diff=1):
+    """One row per player and nationality whose ages are at most `max_age_diff` apart, stats summed."""
+    df = df.sort_values(by=["Player", "Age"]).reset_index(drop=True)
+    heads, members = identity_members(df, max_age_diff)
+    columns = {col: df[col].to_numpy() for col in df.columns}
+    fixed = ["Player", "Team", "League", "Position", "General Position", "Nationality", "Age"]
+    numeric = [col for col in df.columns if col not in fixed and pd.api.types.is_numeric_dtype(df[col])]
+    sums = {col: member_sums(df[col], members) for col in numeric}
+
+    merged_rows = []
+    for k, (i, rows) in enumerate(zip(heads, members)):
+        new_row = {}
+        new_row["Player"] = columns["Player"][i]
+        new_row["Team"] = ', '.join(sorted(set(x for x in columns["Team"][rows] if not pd.isna(x))))
+        new_row["League"] = _leagues(columns["League"][rows])
+        for col in ["Position", "General Position", "Nationality"]:
+            new_row[col] = mode_value(columns[col][rows]) if col in columns else None
+        new_row["Age"] = int(df["Age"].iloc[rows].max())
+
+        for col in df.columns:
+            if col in new_row:
+                continue
+            if col in sums:
+                new_row[col] = sums[col][k]
+            else:
+                new_row[col] = columns[col][rows[0]]
+
+        merged_rows.append(new_row)
+
+    df_merged = pd.DataFrame(merged_rows)
+    df_merged = df_merged.round(2)
+
+    if "Minutes" in df_merged.columns:
+        df_merged["Minutes"] = df_merged["Minutes"].astype("Int64")
+    if "Age" in df_merged.columns:
+        df_merged["Age"] = df_merged["Age"].astype("Int64")
+
+    return df_merged
+
+def season_totals(df):
+    """Season totals per player of a clean file, as written to centiles/."""
+    return merge_similar_players(custom_agg(df))
+
+
+# ------------------------- Derived stats -------------------------
+def add_derived_columns(df):
+    df = df.copy()
+
+    df["Ball Losses"] = (
+        df.get("Dispossessed", 0) + df.get("Miscontrols", 0)
+    )
+
+    df["Progressive Actions (Total)"] = (
+        df.get("Progressive Passes", 0)
+        + df.get("Progressive Runs", 0)
+        + df.get("Progressive Carries", 0)
+        + df.get("Progressive Passes Received", 0)
+    )
+
+    df["Actions created"] = (
+        df.get("Shot-Creating Actions (SCA)", 0)
+        + df.get("Goal-Creating Actions (GCA)", 0)
+    )
+
+    df["Actions in the Penalty Area"] = (
+        df.get("Crosses into Penalty Area", 0)
+        + df.get("Passes into Penalty Area", 0)
+        + df.get("Touches in Attacking Penalty Area", 0)
+        + df.get("Carries into Penalty Area", 0)
+    )
+
+    df["Total Duels Won"] = (
+        df.get("Tackles Won", 0) + df.get("Dribblers Tackled", 0)
+    )
+
+    df["Efficiency"] = (
+        df.get("Goals", 0)
+        - df.get("Expected Goals (xG)", 0)
+    )
+    return df
+
+def add_parameters(df):
+    df = df.copy()
+
+    df["% Efficiency"] = (
+        (df.get("Goals", 0)
+        - df.get("xG", 0))/df.get("xG", 1)
+    )
+
+    df["% Aerial Duels"] = (
+        100 * df.get("Aerials Won", 0) / df.get("Total Aerials", 1)
+    )
+
+    df["% Passes (Total)"] = (
+        100 * df.get("Passes Completed (Total)", 0) / df.get("Passes Attempted (Total)", 1)
+    )
+
+    df["% Passes (Short)"] = (
+        100 * df.get("Passes Completed (Short)", 0) / df.get("Passes Attempted (Short)", 1)
+    )
+
+    df["% Passes (Medium)"] = (
+        100 * df.get("Passes Completed (Medium)", 0) / df.get("Passes Attempted (Medium)", 1)
+    )
+
+    df["% Passes (Long)"] = (
+        100 * df.get("Passes Completed (Long)", 0) / df.get("Passes Attempted (Long)", 1)
+    )
+
+    df["% Tackles/Duels"] = (
+        100 * ( df.get("Tackles Won", 0) + df.get("Dribblers Tackled", 0) ) / (df.get("Tackles", 0) + df.get("Dribbles Challenged", 0))
+    )
+
+    df["% Take-Ons"] = (
+        100 * df.get("Successful Take-Ons", 0) / df.get("Take-Ons Attempted", 1)
+    )
+
+    return df
+
+def add_goalkeeper_parameters(df):
+    df = df.copy()
+
+    df["% Saves"] = (
+        100 * df.get("Saves", 0) / df.get("Shots on Target Against", 1)
+    )
+
+    df["% Long Passes"] = (
+        100 * df.get("Completed Long Passes", 0) / df.get("Attempted Long Passes", 1)
+    )
+
+    df["% Crosses Stopped"] = (
+        100 * df.get("Crosses Stopped", 0) / df.get("Crosses Faced", 1)
+    )
+
+    df["PSxG/Save"] = (
+        df.get("% Saves") * (df.get("Post-Shot Expected Goals (PSxG)", 0))/(df.get("Shots on Target Against", 1))
+    )
+    return df
+
+
+# ------------------------- Engine -------------------------
+def rank_centiles(values, groups=None):
+    """Centile of every value of a (rows, stats) matrix within its group of rows.
+
+    Same numbers as rank(pct=True) * 100 column by column (ties get their
+    average rank, NaN values and rows of a negative group stay NaN). Rows
+    are sorted by group once and every stat of a group in one sort, then
+    ties, ranks and counts come from whole-matrix operations.
+    """
+    values = np.asarray(values, dtype=float)
+    n, k = values.shape
+    groups = np.zeros(n, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    missing = groups < 0
+    groups = np.where(missing, groups.max(initial=0) + 1, groups)
+
+    rows = np.argsort(groups, kind="stable")
+    row_groups = groups[rows]
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = row_groups[1:] != row_groups[:-1]
+    starts = np.flatnonzero(new_group)
+    group_start = starts[np.cumsum(new_group) - 1]
+
+    # Every column sorted by value within each group block, NaN last.
+    order = np.empty((n, k), dtype=np.intp)
+    for start, end in zip(starts, np.r_[starts[1:], n]):
+        block = rows[start:end]
+        order[start:end] = block[np.argsort(values[block], axis=0)]
+    sorted_values = np.take_along_axis(values, order, axis=0)
+
+    position = np.arange(n)[:, None]
+    new_tie = np.ones((n, k), dtype=bool)
+    new_tie[1:] = sorted_values[1:] != sorted_values[:-1]
+    new_tie[new_group] = True
+    last_tie = np.ones((n, k), dtype=bool)
+    last_tie[:-1] = new_tie[1:]
+    tie_start = np.maximum.accumulate(np.where(new_tie, position, 0), axis=0)
+    tie_end = np.minimum.accumulate(np.where(last_tie, position, n)[::-1], axis=0)[::-1]
+    ranks = (tie_start + tie_end) / 2 - group_start[:, None] + 1
+
+    members = (groups[:, None] == np.arange(groups.max(initial=0) + 1)).astype(float)
+    counts = members.T @ ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centiles = ranks / counts[row_groups] * 100
+    centiles[np.isnan(sorted_values) | missing[rows][:, None]] = np.nan
+
+    result = np.empty_like(centiles)
+    np.put_along_axis(result, order, centiles, axis=0)
+    return result
+
+def stat_columns(df, static_cols):
+    return [col for col in df.columns if col not in static_cols and pd.api.types.is_numeric_dtype(df[col])]
+
+def centile_table(df, static_cols, negative_stats, group=None):
+    """`df` with its stat columns replaced by their centiles, negative stats ranked by their opposite."""
+    df = df.copy()
+    stat_cols = stat_columns(df, static_cols)
+    signs = np.where(np.isin(stat_cols, negative_stats), -1.0, 1.0)
+    values = df[stat_cols].to_numpy(dtype=float, na_value=np.nan) * signs
+    groups = pd.factorize(df[group])[0] if group else None
+    df[stat_cols] = rank_centiles(values, groups)
+    return df, stat_cols
+
+def integer_centiles(df, static_cols, negative_stats, group=None):
+    df, stat_cols = centile_table(df, static_cols, negative_stats, group)
+    df[stat_cols] = df[stat_cols].replace([np.inf, -np.inf], 0).fillna(0).astype(int)
+    return df
+
+
+# ------------------------- Players -------------------------
+def player_aggregates(df, static_cols):
+    """Season totals per (Player, Age), with the number of Matches."""
+    numeric_cols = stat_columns(df, static_cols)
+
+    df['Matches'] = 1
+    return df.groupby(['Player', 'Age'], as_index=False).agg({
+        **{col: 'first' for col in static_cols if col in df.columns},
+        **{col: 'sum' for col in numeric_cols},
+        'Matches': 'count'
+    })
+
+def per90(df_aggregated, minutes_col, exclude_cols, parameters, goalkeepers):
+    df_aggregated = df_aggregated.copy()
+
+    minutes = df_aggregated[minutes_col].replace(0, np.nan)
+
+    per90_cols = stat_columns(df_aggregated, exclude_cols)
+
+    for col in per90_cols:
+        df_aggregated[col] = (df_aggregated[col] * 90 / minutes).round(2)
+
+    df_aggregated[minutes_col] = minutes.fillna(0).round(0).astype(int)
+    if goalkeepers:
+        df_aggregated = df_aggregated.fillna(0)
+        return parameters(df_aggregated).round(2)
+
+    return parameters(df_aggregated).round(2).fillna(0)
+
+def aggregated_data(data, goalkeepers=False):
+    df = data.copy() if goalkeepers else add_derived_columns(data)
+    return player_aggregates(df, STATIC_COLUMNS)
+
+def adjusted_data(df_aggregated, goalkeepers=False):
+    parameters = add_goalkeeper_parameters if goalkeepers else add_parameters
+    return per90(df_aggregated, 'Minutes', STATIC_COLUMNS + ['Minutes', 'Matches'], parameters, goalkeepers)
+
+def centiles_data(df_adjusted, goalkeepers=False):
+    if goalkeepers:
+        return integer_centiles(df_adjusted, STATIC_COLUMNS + ['Minutes', 'Matches'], GOALKEEPER_NEGATIVE_STATS)
+    return integer_centiles(df_adjusted, STATIC_COLUMNS + ['Minutes', 'Matches'], NEGATIVE_STATS, 'General Position')
+
+
+# ------------------------- Scouting -------------------------
+def add_scouting_goalkeeper_columns(df):
+    df = df.copy()
+
+    df["Penalties Winner"] = (
+        df.get("Penalty Kicks Missed", 0)
+        + df.get("Penalty Kicks Saved", 0)
+    )
+
+    df["Efficiency"] = (
+        (df.get("Post-Shot Expected Goals (PSxG)", 0)
+        - df.get("Goals Against", 0)) / df.get("Post-Shot Expected Goals (PSxG)", 1)
+    )
+    return df
+
+def scouting_aggregated_data(data, goalkeepers=False):
+    if goalkeepers:
+        return player_aggregates(add_scouting_goalkeeper_columns(data), SCOUTING_GOALKEEPER_STATIC_COLUMNS)
+    return player_aggregates(add_derived_columns(data), SCOUTING_STATIC_COLUMNS)
+
+def scouting_adjusted_data(df_aggregated, goalkeepers=False):
+    parameters = add_goalkeeper_parameters if goalkeepers else add_parameters
+    return per90(df_aggregated, 'Minutes Played', SCOUTING_EXCLUDED_COLUMNS, parameters, goalkeepers)
+
+def scouting_centiles_data(df_adjusted, goalkeepers=False):
+    if goalkeepers:
+        return integer_centiles(df_adjusted, SCOUTING_EXCLUDED_COLUMNS, GOALKEEPER_NEGATIVE_STATS)
+    return integer_centiles(df_adjusted, SCOUTING_EXCLUDED_COLUMNS, NEGATIVE_STATS, 'General Position')
+
+
+# ------------------------- Teams -------------------------
+def add_team_derived_columns(df):
+    df = df.copy()
+
+    df["Total Aerial Duels"] = (
+        df.get("Aerial Duels Won", 0) + df.get("Aerial Duels Lost", 0)
+    )
+
+    df["Ball Losses"] = (
+        df.get("Dispossessed", 0) + df.get("Miscontrols", 0)
+    )
+
+    df["Progressive Actions (Total)"] = (
+        df.get("Progressive Passes", 0)
+        + df.get("Progressive Runs", 0)
+        + df.get("Progressive Carries", 0)
+        + df.get("Progressive Passes Received", 0)
+    )
+
+    df["Actions created"] = (
+        df.get("Shot Creating Actions", 0)
+        + df.get("Goal Creating Actions", 0)
+    )
+
+    df["Actions in the Penalty Area"] = (
+        df.get("Crosses into Penalty Area", 0)
+        + df.get("Passes into Penalty Area", 0)
+        + df.get("Touches Attacking Penalty Area", 0)
+        + df.get("Carries into Penalty Area", 0)
+    )
+
+    df["Total Duels won"] = (
+        df.get("Tackles Won", 0)
+        + df.get("Challenges Tackled", 0)
+    )
+
+    df["Penaltys Winner"] = (
+        df.get("Penalty Kicks Missed", 0)
+        + df.get("Penalty Kicks Saved", 0)
+    )
+
+    return df
+
+def add_team_parameters(df):
+    df = df.copy()
+
+    df["Efficiency"] = (
+        (df.get("Goals", 0) - df.get("xG", 0))/df.get("xG", 0)
+    )
+
+    df["% Aerial Duels"] = (
+        100 * df.get("Aerial Duels Won", 0) / df.get("Total Aerial Duels", 0)
+    )
+
+    df["% Passes (Total)"] = (
+        100 * df.get("Passes Completed (Total)", 0) / df.get("Passes Attempted (Total)", 0)
+    )
+
+    df["% Passes (Short)"] = (
+        100 * df.get("Passes Completed (Short)", 0) / df.get("Passes Attempted (Short)", 0)
+    )
+
+    df["% Passes (Medium)"] = (
+        100 * df.get("Passes Completed (Medium)", 0) / df.get("Passes Attempted (Medium)", 0)
+    )
+
+    df["% Passes (Long)"] = (
+        100 * df.get("Passes Completed (Long)", 0) / df.get("Passes Attempted (Long)", 0)
+    )
+
+    df["% Tackles/Duels"] = (
+        100 * (df.get("Tackles Won", 0) + df.get("Challenges Tackled", 0))/ (df.get("Tackles", 0) + df.get("Challenges Attempted", 0))
+    )
+
+    df["% Take-Ons"] = (
+        100 * df.get("Successful Take-Ons", 0) / df.get("Take-Ons Attempted", 0)
+    )
+
+    df["Efficiency GK"] = (
+        (df.get("Post-Shot Expected Goals", 0) - df.get("Goals Against", 0))/ df.get("Post-Shot Expected Goals", 0)
+    )
+
+    df["% Saves"] = (
+        100 * df.get("Saves", 0) / df.get("Shots on Target Against", 0)
+    )
+
+    df["% Long Passes GK"] = (
+        100 * df.get("Launched Passes Completed", 0) / df.get("Launched Passes Attempted", 0)
+    )
+
+    df["% Crosses Stopped"] = (
+        100 * df.get("Crosses Stopped", 0) / df.get("Crosses Opposed", 0)
+    )
+
+    return df
+
+def team_aggregated_data(data):
+    df = add_team_derived_columns(data)
+    static_cols = ['Average Age']
+
+    numeric_cols = stat_columns(df, static_cols)
+
+    df_aggregated = df.groupby('Team', as_index=False).agg({
+        **{col: 'first' for col in static_cols if col in df.columns},
+        **{col: 'sum' for col in numeric_cols}
+    })
+
+    if 'Possession' in df.columns and 'Matches Played' in df.columns:
+        possession_weighted = (
+            df[['Team', 'Possession', 'Matches Played']]
+            .assign(Possession_x_MP = df['Possession'] * df['Matches Played'])
+            .groupby('Team', as_index=False)
+            .agg({
+                'Possession_x_MP': 'sum',
+                'Matches Played': 'sum'
+            })
+            .assign(Possession = lambda d: d['Possession_x_MP'] / d['Matches Played'])
+            [['Team', 'Possession']]
+        )
+
+        df_aggregated = df_aggregated.drop(columns='Possession', errors='ignore')
+        df_aggregated = df_aggregated.merge(possession_weighted, on='Team', how='left')
+
+    return df_aggregated
+
+def team_adjusted_data(df_aggregated):
+    df_aggregated = df_aggregated.copy()
+
+    matches = df_aggregated['Matches Played'].replace(0, np.nan)
+
+    exclude_cols = ['Matches Played', 'Average Age', 'Possession']
+
+    per_match_cols = stat_columns(df_aggregated, exclude_cols)
+
+    for col in per_match_cols:
+        df_aggregated[col] = (df_aggregated[col] / matches).round(2)
+
+    df_aggregated['Matches Played'] = matches.fillna(0).round(0).astype(int)
+    df_adjusted = add_team_parameters(df_aggregated).round(2)
+    df_adjusted = df_adjusted.fillna(0)
+
+    return df_adjusted
+
+def team_centiles_data(df_adjusted):
+    df_centiles, stat_cols = centile_table(df_adjusted, TEAM_STATIC_COLUMNS, TEAM_NEGATIVE_STATS)
+    df_centiles[stat_cols] = df_centiles[stat_cols].round(2)
+    return df_centiles
+
+
+# ------------------------- Domains -------------------------
+# Source file, output pattern and (aggregated, adjusted, centiles) steps of
+# every domain; outputs are named after the step.
+DOMAINS = {
+    "players": (
+        "players/centiles/data_players.csv", "players/centiles/data_players_{}.csv",
+        (aggregated_data, adjusted_data, centiles_data),
+    ),
+    "goalkeepers": (
+        "players/centiles/data_goals.csv", "players/centiles/data_goals_{}.csv",
+        tuple(partial(step, goalkeepers=True) for step in (aggregated_data, adjusted_data, centiles_data)),
+    ),
+    "teams": (
+        "teams/Teams.csv", "teams/Teams_{}.csv",
+        (team_aggregated_data, team_adjusted_data, team_centiles_data),
+    ),
+    "scouting": (
+        "scouting/Scouting.csv", "scouting/Scouting_{}.csv",
+        (scouting_aggregated_data, scouting_adjusted_data, scouting_centiles_data),
+    ),
+    "scouting_gk": (
+        "scouting/Scouting_gk.csv", "scouting/Scouting_{}_gk.csv",
+        tuple(partial(step, goalkeepers=True) for step in (scouting_aggregated_data, scouting_adjusted_data, scouting_centiles_data)),
+    ),
+}
+
+def domain_outputs(source_df, domain):
+    aggregated, adjusted, centiles = DOMAINS[domain][2]
+    df_aggregated = aggregated(source_df)
+    df_adjusted = adjusted(df_aggregated)
+    return {"aggregated": df_aggregated, "adjusted": df_adjusted, "centiles": centiles(df_adjusted)}
+
+def write_domain(season, domain):
+    source, pattern, _ = DOMAINS[domain]
+    if not os.path.exists(season_path(season, source)):
+        return f"{season} {domain}: no {source}, skipped"
+    outputs = domain_outputs(pd.read_csv(season_path(season, source)), domain)
+    for step, df in outputs.items():
+        df.to_csv(season_path(season, pattern.format(step)), index=False)
+    return f"{season} {domain}: {len(outputs['centiles'])} rows"
+
+def write_domains(jobs, workers=None):
+    """Run every (season, domain) job, in parallel processes when there is more than one worker."""
+    if workers == 1 or len(jobs) < 2:
+        return [write_domain(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(write_domain, *zip(*jobs)))
+
+
+# ------------------------- CLI -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Aggregated, per-90 and centile files of players, goalkeepers, teams and scouting.")
+    parser.add_argument("--season", action="append", choices=list(SEASONS), help="default: every season")
+    parser.add_argument("--domain", action="append", choices=list(DOMAINS), help="default: every domain")
+    parser.add_argument("--workers", type=int, default=None, help="processes, default: one per core")
+    args = parser.parse_args()
+
+    jobs = [(season, domain) for season in args.season or list(SEASONS) for domain in args.domain or list(DOMAINS)]
+    for line in write_domains(jobs, args.workers):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
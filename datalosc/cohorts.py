@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from datalosc.centiles import GOALKEEPER_NEGATIVE_STATS, NEGATIVE_STATS, STATIC_COLUMNS, stat_columns
+from datalosc.store import season_path, store
+
+ADJUSTED_FILES = {
+    False: "players/centiles/data_players_adjusted.csv",
+    True: "players/centiles/data_goals_adjusted.csv",
+}
+CENTILE_STATIC_COLUMNS = STATIC_COLUMNS + ['Minutes', 'Matches']
+
+
+# ------------------------- Index -------------------------
+def build_cohort_index(df, static_cols, negative_stats, group=None):
+    """Presorted stat values of every group of rows, with the sorted span of each row's own value.
+
+    Negative stats are stored with their sign flipped, so higher is always
+    better, as in the centile files.
+    """
+    stat_cols = stat_columns(df, static_cols)
+    signs = np.where(np.isin(stat_cols, negative_stats), -1.0, 1.0)
+    values = df[stat_cols].to_numpy(dtype=float, na_value=np.nan) * signs
+    groups = pd.factorize(df[group])[0] if group else np.zeros(len(df), dtype=np.int64)
+
+    blocks = []
+    for code in np.unique(groups[groups >= 0]):
+        rows = np.flatnonzero(groups == code)
+        block = values[rows]
+        order = np.argsort(block, axis=0)
+        sorted_values = np.take_along_axis(block, order, axis=0)
+        blocks.append({
+            "rows": rows,
+            "order": order,
+            "left": np.stack([np.searchsorted(sorted_values[:, j], block[:, j], "left") for j in range(len(stat_cols))], axis=1),
+            "right": np.stack([np.searchsorted(sorted_values[:, j], block[:, j], "right") for j in range(len(stat_cols))], axis=1),
+            "valid": (~np.isnan(sorted_values)).sum(axis=0),
+        })
+    return {"stat_cols": stat_cols, "values": values, "blocks": blocks}
+
+def load_cohort_index(season, goalkeepers=False):
+    path = season_path(season, ADJUSTED_FILES[goalkeepers])
+    if goalkeepers:
+        builder = lambda: build_cohort_index(pd.read_csv(path), CENTILE_STATIC_COLUMNS, GOALKEEPER_NEGATIVE_STATS)
+    else:
+        builder = lambda: build_cohort_index(pd.read_csv(path), CENTILE_STATIC_COLUMNS, NEGATIVE_STATS, 'General Position')
+    return store.derive("cohort index", [path], builder)
+
+
+# ------------------------- Queries -------------------------
+def cohort_mask(df, max_age=None, min_age=None, leagues=None, min_minutes=0):
+    """Rows of `df` in the cohort; a player with several leagues ("A, B") belongs to each of them."""
+    mask = np.ones(len(df), dtype=bool)
+    if max_age is not None:
+        mask &= (df["Age"] <= max_age).to_numpy()
+    if min_age is not None:
+        mask &= (df["Age"] >= min_age).to_numpy()
+    if leagues:
+        player_leagues = df["League"].fillna("").astype(str).str.split(", ")
+        mask &= player_leagues.map(lambda values: not set(values).isdisjoint(leagues)).to_numpy(dtype=bool)
+    if min_minutes:
+        mask &= (df["Minutes"] >= min_minutes).to_numpy()
+    return mask
+
+def cohort_centiles(index, mask):
+    """Centile of every row's stats against the rows of `mask` of its group.
+
+    A row outside the cohort is ranked as if it joined it. With every row
+    in the cohort these are the numbers of rank(pct=True) * 100, so of the
+    centile files. NaN where a row has no value or no group.
+    """
+    values = index["values"]
+    mask = np.asarray(mask, dtype=bool)
+    result = np.full(values.shape, np.nan)
+    for block in index["blocks"]:
+        rows = block["rows"]
+        member = mask[rows]
+        # Cohort members among the first i sorted values of every stat.
+        counts = np.zeros((len(rows) + 1, values.shape[1]))
+        np.cumsum(member[block["order"]], axis=0, out=counts[1:])
+        less = np.take_along_axis(counts, block["left"], axis=0)
+        others = np.take_along_axis(counts, block["right"], axis=0) - less - member[:, None]
+        total = counts[block["valid"], np.arange(values.shape[1])] + ~member[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            centiles = (less + others / 2 + 1) / total * 100
+        centiles[np.isnan(values[rows])] = np.nan
+        result[rows] = centiles
+    return result
+
+def cohort_table(index, df, mask):
+    """`df` (the frame the index was built from) with its stats replaced by integer cohort centiles."""
+    df = df.copy()
+    centiles = pd.DataFrame(cohort_centiles(index, mask), columns=index["stat_cols"], index=df.index)
+    df[index["stat_cols"]] = centiles.replace([np.inf, -np.inf], 0).fillna(0).astype(int)
+    return df
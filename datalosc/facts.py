@@ -0,0 +1,152 @@
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from datalosc.players import player_ids
+from datalosc.store import SEASONS, file_signature, load_fixtures, partition_index, season_path, store
+
+MATCH_KEYS = ["League", "Game Week", "Team"]
+PLAYER_KEYS = ["Player", "Game Week", "Team", "League"]
+STATS_FILES = {
+    "players": "players/clean/data_players.csv",
+    "goals": "players/clean/data_goals.csv",
+}
+RATINGS_FILES = ["players/ratings/data_players.csv", "players/ratings/data_goals.csv"]
+FACTS_FILE = "players/facts/data_matches.csv"
+FACTS_DTYPES = dict({k: str for k in PLAYER_KEYS}, Home="boolean")
+# Integer surrogate keys carried by the fact table, for joins and filters.
+KEY_COLUMNS = ["Player ID", "Team ID", "League ID", "Game Week Number"]
+
+# Outfield stats summed per team and match for the Matchday Player Report.
+TEAM_STATS = [
+    'Expected Goals (xG)', 'Progressive Passes', 'Progressive Carries',
+    'Key Passes', 'Passes into Final Third', 'Tackles Won', 'Interceptions', 'Aerials Won', 'Offsides',
+]
+TEAM_TOTALS = {stat: f"Team {stat}" for stat in TEAM_STATS}
+
+
+# ------------------------- Build -------------------------
+def source_paths(season):
+    paths = [season_path(season, f) for f in list(STATS_FILES.values()) + RATINGS_FILES]
+    return paths + sorted(glob.glob(season_path(season, "Leagues Games", "*_games.csv")))
+
+def gameweek_number(weeks):
+    return pd.to_numeric(weeks.astype(str).str.strip().str.lstrip("J"), errors="coerce")
+
+def key_codes(frames, keys):
+    """One int64 code per row of every frame, the same in every frame for the same `keys` values (as strings)."""
+    codes = [np.zeros(len(df), dtype=np.int64) for df in frames]
+    for key in keys:
+        factorized = [pd.factorize(df[key], use_na_sentinel=False) for df in frames]
+        vocabulary, inverse = np.unique(
+            np.concatenate([np.asarray(uniques, dtype=str) for _, uniques in factorized]), return_inverse=True
+        )
+        start = 0
+        for i, (rows, uniques) in enumerate(factorized):
+            codes[i] = codes[i] * len(vocabulary) + inverse[start:start + len(uniques)][rows]
+            start += len(uniques)
+    return codes
+
+def lookup(table, table_codes, codes, columns):
+    """`columns` of the first `table` row of every code, NaN where there is none."""
+    first = ~pd.Series(table_codes).duplicated().to_numpy()
+    return table.loc[first, columns].set_axis(table_codes[first]).reindex(codes).reset_index(drop=True)
+
+def team_totals(facts, match_codes):
+    """Team totals of TEAM_STATS for every row's match."""
+    outfield = (facts["Source"] == "players").to_numpy()
+    cols = [col for col in TEAM_STATS if col in facts.columns]
+    totals = facts.loc[outfield, cols].apply(pd.to_numeric, errors='coerce').fillna(0)
+    totals = totals.groupby(match_codes[outfield]).sum().round(2)
+    totals = totals.reindex(columns=TEAM_STATS).rename(columns=TEAM_TOTALS)
+    return totals.reindex(match_codes).fillna(0).reset_index(drop=True)
+
+def surrogate_keys(facts):
+    return pd.DataFrame({
+        "Player ID": player_ids(facts),
+        "Team ID": pd.factorize(facts["Team"], sort=True)[0],
+        "League ID": pd.factorize(facts["League"], sort=True)[0],
+        "Game Week Number": gameweek_number(facts["Game Week"]).astype("Int64").to_numpy(),
+    })
+
+def build_match_facts(season):
+    """One row per player and match: clean stats, Rating, fixture and team totals.
+
+    Rows are sorted by (League, Game Week, Team), game weeks in numeric order.
+    The ratings, fixtures and team totals are looked up by integer key codes
+    rather than merged on the string columns.
+    """
+    frames = []
+    for source, path in STATS_FILES.items():
+        if os.path.exists(season_path(season, path)):
+            frames.append(pd.read_csv(season_path(season, path)).assign(Source=source))
+    if not frames:
+        return pd.DataFrame(columns=PLAYER_KEYS + ["Source", "Rating", "Opponent", "Score", "Venue", "Home"] + KEY_COLUMNS)
+    facts = pd.concat(frames, ignore_index=True).drop(columns=["ID"], errors="ignore")
+    for col in PLAYER_KEYS:
+        facts[col] = facts[col].astype(str)
+
+    ratings = [pd.read_csv(season_path(season, p)) for p in RATINGS_FILES if os.path.exists(season_path(season, p))]
+    if ratings:
+        ratings = pd.concat(ratings, ignore_index=True)
+        codes, rating_codes = key_codes([facts, ratings], PLAYER_KEYS)
+        rating = lookup(ratings, rating_codes, codes, ["Rating"])
+    else:
+        rating = pd.DataFrame({"Rating": float("nan")}, index=facts.index)
+
+    fixtures = load_fixtures(season)
+    codes, fixture_codes = key_codes([facts, fixtures], MATCH_KEYS)
+    fixture = lookup(fixtures, fixture_codes, codes, ["Opponent", "Score", "Venue", "Home"])
+    facts = pd.concat([facts, rating, fixture, team_totals(facts, codes), surrogate_keys(facts)], axis=1)
+
+    facts = facts.sort_values(
+        MATCH_KEYS, key=lambda col: gameweek_number(col) if col.name == "Game Week" else col, kind="stable"
+    )
+    return facts.reset_index(drop=True)
+
+def write_match_facts(season):
+    path = season_path(season, FACTS_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    facts = build_match_facts(season)
+    facts.to_csv(path, index=False)
+    return facts
+
+
+# ------------------------- Load -------------------------
+def is_fresh(path, sources):
+    signature = file_signature(path)
+    if signature is None:
+        return False
+    return all(sig is None or sig[0] <= signature[0] for sig in map(file_signature, sources))
+
+def load_match_facts(season):
+    """The season's fact table, read from FACTS_FILE when it is up to date or built on the fly."""
+    path = season_path(season, FACTS_FILE)
+    sources = source_paths(season)
+    if is_fresh(path, sources):
+        return store.read_csv(path, dtype=FACTS_DTYPES)
+    return store.derive("match facts", sources, lambda: build_match_facts(season))
+
+def load_match_partitions(season):
+    """The fact table and its (League, Game Week, Team) partition index."""
+    facts = load_match_facts(season)
+    paths = source_paths(season) + [season_path(season, FACTS_FILE)]
+    return facts, store.derive("match partitions", paths, lambda: partition_index(facts, MATCH_KEYS))
+
+
+# ------------------------- CLI -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build the match-level fact table of each season.")
+    parser.add_argument("--season", action="append", choices=list(SEASONS), help="default: every season")
+    args = parser.parse_args()
+
+    for season in args.season or list(SEASONS):
+        facts = write_match_facts(season)
+        print(f"{season}: {len(facts)} rows -> {season_path(season, FACTS_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from datalosc.store import SEASONS, season_path, store
+
+METRICS_STATIC_COLUMNS = ['Player', 'Nationality', 'Team', 'League', 'Position', 'General Position', 'Age', 'Minutes', 'Matches']
+# Centile file and metrics file of players and goalkeepers.
+METRICS_FILES = {
+    False: ("players/centiles/data_players_centiles.csv", "players/metrics/data_players_metrics.csv"),
+    True: ("players/centiles/data_goals_centiles.csv", "players/metrics/data_goals_metrics.csv"),
+}
+
+
+# ------------------------- Weights -------------------------
+PLAYER_INDICES = {
+    "Shouting Index": {
+        "Goals": 25,
+        "Efficiency": 40,
+        "Shots Total": 15,
+        "Shots on Target": 20,
+    },
+    "Creation Index": {
+        "Assists": 15,
+        "Expected Assists (xA)": 15,
+        "Actions created": 30,
+        "Through Balls": 20,
+        "Actions in the Penalty Area": 20,
+        "Successful Take-Ons": 20,
+    },
+    "Passing Index": {
+        "Passes Completed": 20,
+        "Progressive Passes": 20,
+        "Passes into Final Third": 20,
+        "Key Passes": 20,
+        "% Passes (Total)": 20,
+    },
+    "Possession Index": {
+        "Touches": 25,
+        "Carries": 25,
+        "Progressive Carries": 25,
+        "Carries into Final Third": 20,
+        "Touches in Attacking Third": 20,
+    },
+    "Defense Index": {
+        "Tackles": 20,
+        "Tackles Won": 30,
+        "Interceptions": 30,
+        "Blocks": 10,
+        "Clearances": 10,
+        "Total Duels Won": 20,
+        "Aerials Won": 20,
+        "Ball Recoveries": 30,
+    },
+}
+
+GOALKEEPER_INDICES = {
+    "Line Index": {
+        "Goals Against": 10,
+        "Saves": 10,
+        "Clean Sheets": 5,
+        "Defensive Actions Outside Penalty Area": 5,
+        "Crosses Stopped": 5,
+        "Save Efficiency": 60,
+        "% Saves": 10,
+        "% Crosses Stopped": 5,
+        "PSxG/Save": 80,
+    },
+    "Passes Index": {
+        "Completed Long Passes": 40,
+        "Attempted Passes (excluding GK)": 20,
+        "Attempted Throws": 20,
+        "% Long Passes": 40,
+    },
+}
+
+# Weights of the player indices in the Global Index of every General Position.
+GLOBAL_WEIGHTS = {
+    "Defender": {"Shouting Index": 2, "Creation Index": 1, "Passing Index": 3, "Possession Index": 3, "Defense Index": 6},
+    "Midfielder": {"Shouting Index": 2, "Creation Index": 2, "Passing Index": 3, "Possession Index": 3, "Defense Index": 5},
+    "Forward": {"Shouting Index": 5, "Creation Index": 5, "Passing Index": 3, "Possession Index": 3, "Defense Index": 1},
+}
+DEFAULT_GLOBAL_WEIGHTS = {"Shouting Index": 2, "Creation Index": 2, "Passing Index": 2, "Possession Index": 2, "Defense Index": 2}
+
+
+# ------------------------- Matrices -------------------------
+def weight_matrix(indices, columns):
+    """(columns, indices) matrix holding the weights of every index in its column, zero elsewhere."""
+    position = {col: i for i, col in enumerate(columns)}
+    matrix = np.zeros((len(columns), len(indices)))
+    for j, weights in enumerate(indices.values()):
+        for col, weight in weights.items():
+            matrix[position[col], j] = weight
+    return matrix
+
+def weighted_means(values, matrix):
+    """Weighted mean of the rows of `values` for every column of `matrix`, 0 for an index without weights.
+
+    Centiles and weights are integers, so the products and sums are exact
+    and the means are those of the notebooks' weighted sums.
+    """
+    totals = matrix.sum(axis=0)
+    return np.divide(values @ matrix, totals, out=np.zeros((len(values), matrix.shape[1])), where=totals != 0)
+
+def build_index_matrix(df_centiles):
+    """Static columns and centile matrix of a centile file, a missing centile counting as 0."""
+    static_cols = [col for col in METRICS_STATIC_COLUMNS if col in df_centiles.columns]
+    stat_cols = [col for col in df_centiles.columns if col not in METRICS_STATIC_COLUMNS]
+    return {
+        "static": df_centiles[static_cols],
+        "stat_cols": stat_cols,
+        "values": np.nan_to_num(df_centiles[stat_cols].to_numpy(dtype=float, na_value=np.nan)),
+    }
+
+def load_index_matrix(season, goalkeepers=False):
+    path = season_path(season, METRICS_FILES[goalkeepers][0])
+    return store.derive("index matrix", [path], lambda: build_index_matrix(pd.read_csv(path)))
+
+
+# ------------------------- Indices -------------------------
+def compute_indices(index_matrix, indices):
+    """Rounded indices of every row, one column per index."""
+    matrix = weight_matrix(indices, index_matrix["stat_cols"])
+    return np.round(weighted_means(index_matrix["values"], matrix)).astype(int)
+
+def global_index(df_indices, global_weights=GLOBAL_WEIGHTS, default_weights=DEFAULT_GLOBAL_WEIGHTS):
+    """Rounded Global Index: the indices weighted by the weights of each row's General Position."""
+    names = list(default_weights)
+    positions = list(global_weights)
+    matrix = np.array([[weights[name] for name in names] for weights in [*global_weights.values(), default_weights]], dtype=float)
+    codes = pd.Index(positions).get_indexer(df_indices["General Position"])
+    weights = matrix[np.where(codes < 0, len(positions), codes)]
+    totals = weights.sum(axis=1)
+    values = (df_indices[names].to_numpy(dtype=float) * weights).sum(axis=1)
+    return np.round(np.divide(values, totals, out=np.zeros(len(values)), where=totals != 0)).astype(int)
+
+def index_table(index_matrix, indices, global_weights=None, default_weights=DEFAULT_GLOBAL_WEIGHTS):
+    """Static columns and indices of every row, with a Global Index when `global_weights` are given."""
+    df = index_matrix["static"].copy()
+    df[list(indices)] = compute_indices(index_matrix, indices)
+    if global_weights is not None:
+        df["Global Index"] = global_index(df, global_weights, default_weights)
+    return df
+
+def create_indices_df(df_centiles, goalkeepers=False):
+    index_matrix = build_index_matrix(df_centiles)
+    if goalkeepers:
+        return index_table(index_matrix, GOALKEEPER_INDICES)
+    return index_table(index_matrix, PLAYER_INDICES, GLOBAL_WEIGHTS)
+
+
+# ------------------------- CLI -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Performance indices of the players and goalkeepers of every season.")
+    parser.add_argument("--season", action="append", choices=list(SEASONS), help="default: every season")
+    args = parser.parse_args()
+
+    for season in args.season or list(SEASONS):
+        for goalkeepers, (source, target) in METRICS_FILES.items():
+            if not os.path.exists(season_path(season, source)):
+                print(f"{season}: no {source}, skipped")
+                continue
+            df_indices = create_indices_df(pd.read_csv(season_path(season, source)), goalkeepers)
+            os.makedirs(os.path.dirname(season_path(season, target)), exist_ok=True)
+            df_indices.to_csv(season_path(season, target), index=False)
+            print(f"{season}: {len(df_indices)} rows -> {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+MANIFEST_FILE = "manifest.jsonl"
+
+
+# ------------------------- Cache -------------------------
+class PageCache:
+    """Fetched pages stored gzipped under the sha256 of their content, with a manifest of every fetch.
+
+    The manifest has one line per fetch (url, fetch time, digest, size),
+    so a page fetched again is kept next to the earlier version and the
+    latest one is served. Identical pages share one file.
+    """
+
+    def __init__(self, folder):
+        self.folder = str(folder)
+        self.manifest = os.path.join(self.folder, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.latest = {}
+        if os.path.exists(self.manifest):
+            with open(self.manifest, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.latest[entry["url"]] = entry
+
+    def object_path(self, digest):
+        return os.path.join(self.folder, "objects", digest[:2], f"{digest}.html.gz")
+
+    def put(self, url, page, fetched_at=None):
+        data = page.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written aside then renamed, so an interrupted run never leaves a truncated page.
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(gzip.compress(data, mtime=0))
+            os.replace(tmp, path)
+        entry = {
+            "url": url,
+            "fetched_at": fetched_at or datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "sha256": digest,
+            "size": len(data),
+        }
+        with self.lock:
+            with open(self.manifest, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.latest[url] = entry
+        return entry
+
+    def get(self, url):
+        """Latest page fetched from `url`, None if it never was."""
+        entry = self.latest.get(url)
+        if entry is None:
+            return None
+        with gzip.open(self.object_path(entry["sha256"]), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def __contains__(self, url):
+        return url in self.latest
+
+    def __len__(self):
+        return len(self.latest)
+
+
+class ReplayFetcher:
+    """Drop-in for a Fetcher reading the pages back from a PageCache, without network or rate limit."""
+
+    def __init__(self, cache, size=4):
+        self.cache = cache
+        self.size = size
+
+    def __call__(self, url):
+        page = self.cache.get(url)
+        if page is None:
+            raise KeyError(f"{url} is not in the page cache")
+        return page
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------------- CLI -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Summary of a page cache.")
+    parser.add_argument("folder")
+    args = parser.parse_args()
+
+    cache = PageCache(args.folder)
+    objects = {entry["sha256"] for entry in cache.latest.values()}
+    size = sum(os.path.getsize(cache.object_path(digest)) for digest in objects)
+    raw = sum(entry["size"] for entry in cache.latest.values())
+    print(f"{len(cache)} pages, {len(objects)} files, {raw / 1e6:.1f} MB raw, {size / 1e6:.1f} MB on disk")
+
+
+if __name__ == "__main__":
+    main()
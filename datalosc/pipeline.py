@@ -0,0 +1,220 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+from datalosc.centiles import adjusted_data, aggregated_data, centiles_data, season_totals
+from datalosc.players import register_players
+from datalosc.ratings import (
+    RATINGS, REFERENCE_VERSION, average_ratings, build_centile_tensor, clean_path, load_reference, reference_path,
+    tensor_path, write_centile_tensor,
+)
+from datalosc.store import SEASONS, season_code, season_path
+
+# Bump when a step's output changes so the next run rebuilds every season.
+PIPELINE_VERSION = 1
+PARTITION_KEYS = ["League", "Game Week"]
+MANIFEST_FILE = "players/manifest.json"
+GOALKEEPER_FILES = ["data_goals.csv"]
+
+
+# ------------------------- Paths -------------------------
+def output_paths(season, name):
+    stem = name.replace(".csv", "")
+    return {
+        "ratings": season_path(season, "players", "ratings", name),
+        "average": season_path(season, "players", "ratings", f"{stem}_average.csv"),
+        "totals": season_path(season, "players", "centiles", name),
+        "aggregated": season_path(season, "players", "centiles", f"{stem}_aggregated.csv"),
+        "adjusted": season_path(season, "players", "centiles", f"{stem}_adjusted.csv"),
+        "centiles": season_path(season, "players", "centiles", f"{stem}_centiles.csv"),
+        "tensor": tensor_path(season, name),
+    }
+
+
+# ------------------------- Manifest -------------------------
+def partition_labels(df):
+    return df["League"].fillna("").astype(str) + "|" + df["Game Week"].fillna("").astype(str)
+
+def partition_hashes(clean):
+    """Content hash and players of every (League, Game Week) partition of a clean file."""
+    row_hashes = pd.util.hash_pandas_object(clean, index=False).to_numpy()
+    partitions = {}
+    for label, rows in pd.Series(range(len(clean))).groupby(partition_labels(clean).to_numpy(), sort=False):
+        rows = rows.to_numpy()
+        partitions[label] = {
+            "hash": hashlib.sha256(row_hashes[rows].tobytes()).hexdigest(),
+            "players": sorted(clean["Player"].iloc[rows].dropna().astype(str).unique()),
+        }
+    return partitions
+
+def reference_state(reference_season, name):
+    with open(reference_path(reference_season, name), "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"season": season_code(reference_season), "version": REFERENCE_VERSION, "sha256": digest}
+
+def read_manifest(season):
+    path = season_path(season, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest if manifest.get("version") == PIPELINE_VERSION else {}
+
+def write_manifest(season, manifest):
+    path = season_path(season, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(manifest, version=PIPELINE_VERSION), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# ------------------------- Files -------------------------
+def _text(df):
+    """Rows as the exact strings to_csv writes, so kept and new rows are written back unchanged."""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)), dtype=str, keep_default_na=False)
+
+def append_rows(path, new):
+    new.to_csv(path, mode="a", header=False, index=False)
+
+def replace_rows(path, new, drop, sort_key=None):
+    """Rewrite `path` without the rows selected by `drop(rows)`, plus `new`, stably sorted by `sort_key(rows)`."""
+    rows = pd.read_csv(path, dtype=str, keep_default_na=False)
+    rows = pd.concat([rows[~drop(rows)], _text(new)], ignore_index=True)
+    if sort_key is not None:
+        rows = rows.iloc[sort_key(rows).argsort(kind="stable")]
+    rows.to_csv(path, index=False)
+
+def _player_rows(players):
+    return lambda rows: rows["Player"].isin(players)
+
+def _by_player(rows):
+    return rows["Player"].to_numpy()
+
+
+# ------------------------- Steps -------------------------
+def register(paths):
+    """Give the players of the new ratings and totals their registry ID."""
+    register_players(pd.concat([pd.read_csv(paths[k]) for k in ("ratings", "totals")], ignore_index=True))
+
+def refresh_centiles(paths, goalkeepers):
+    """Per-90 and centile files from the aggregated totals; ranks are season-wide, so always rebuilt."""
+    df_aggregated = pd.read_csv(paths["aggregated"], float_precision="round_trip")
+    df_adjusted = adjusted_data(df_aggregated, goalkeepers)
+    df_adjusted.to_csv(paths["adjusted"], index=False)
+    centiles_data(df_adjusted, goalkeepers).to_csv(paths["centiles"], index=False)
+
+def refresh_tensor(paths, name, clean, reference):
+    """Per-match centiles of the whole season: computing them is a search per stat, so always rebuilt."""
+    write_centile_tensor(paths["tensor"], build_centile_tensor(clean.set_index("Player"), reference, name))
+
+def rebuild(season, name, clean, reference):
+    paths = output_paths(season, name)
+    goalkeepers = name in GOALKEEPER_FILES
+    RATINGS[name](clean.set_index("Player"), reference).to_csv(paths["ratings"], index=False)
+    refresh_tensor(paths, name, clean, reference)
+    average_ratings(pd.read_csv(paths["ratings"], index_col=0)).to_csv(paths["average"], index=False)
+
+    os.makedirs(os.path.dirname(paths["totals"]), exist_ok=True)
+    season_totals(clean).to_csv(paths["totals"], index=False)
+    aggregated_data(pd.read_csv(paths["totals"]), goalkeepers).to_csv(paths["aggregated"], index=False)
+    refresh_centiles(paths, goalkeepers)
+    register(paths)
+
+def update(season, name, clean, reference, changed, removed, touched, append):
+    """Rate the changed partitions and recompute the summaries of the players they touch only.
+
+    New ratings go after the existing ones: with `append` (new partitions
+    only) the file is appended to, otherwise it is rewritten without the
+    rows of the changed and removed partitions first.
+    """
+    paths = output_paths(season, name)
+    goalkeepers = name in GOALKEEPER_FILES
+    labels = partition_labels(clean)
+
+    notes = RATINGS[name](clean[labels.isin(changed)].set_index("Player"), reference)
+    if append:
+        append_rows(paths["ratings"], notes)
+    else:
+        rewritten = set(changed) | set(removed)
+        replace_rows(paths["ratings"], notes, lambda rows: partition_labels(rows).isin(rewritten))
+    refresh_tensor(paths, name, clean, reference)
+
+    # Every summary groups rows by player name, so only the touched players'
+    # rows are recomputed and spliced into the season files.
+    players = _player_rows(touched)
+    ratings = pd.read_csv(paths["ratings"], index_col=0)
+    replace_rows(paths["average"], average_ratings(ratings[ratings.index.isin(touched)]), players, _by_player)
+    replace_rows(paths["totals"], season_totals(clean[clean["Player"].isin(touched)]), players, _by_player)
+    totals = pd.read_csv(paths["totals"])
+    replace_rows(paths["aggregated"], aggregated_data(totals[totals["Player"].isin(touched)], goalkeepers), players, _by_player)
+    refresh_centiles(paths, goalkeepers)
+    register(paths)
+
+
+# ------------------------- Run -------------------------
+def run(season, reference_season, files=None, full=False):
+    manifest = read_manifest(season)
+    complete = manifest.get("complete", False)
+    manifest = {"complete": False, "files": manifest.get("files", {})}
+    write_manifest(season, manifest)
+
+    for name in files or list(RATINGS):
+        if not os.path.exists(clean_path(season, name)):
+            print(f"{season} {name}: no clean data, skipped")
+            continue
+        try:
+            reference = load_reference(reference_season, name)
+        except FileNotFoundError:
+            print(f"{season} {name}: no {reference_season} reference, skipped")
+            continue
+
+        clean = pd.read_csv(clean_path(season, name))
+        state = {
+            "columns": list(clean.columns),
+            "reference": reference_state(reference_season, name),
+            "partitions": partition_hashes(clean),
+        }
+        previous = manifest["files"].get(name, {})
+        outputs = all(os.path.exists(p) for p in output_paths(season, name).values())
+        incremental = (
+            not full and complete and outputs
+            and previous.get("columns") == state["columns"] and previous.get("reference") == state["reference"]
+        )
+
+        if not incremental:
+            rebuild(season, name, clean, reference)
+            print(f"{season} {name}: rebuilt {len(state['partitions'])} partitions")
+        else:
+            old, new = previous["partitions"], state["partitions"]
+            changed = [label for label in new if old.get(label, {}).get("hash") != new[label]["hash"]]
+            removed = [label for label in old if label not in new]
+            if changed or removed:
+                touched = {p for label in changed for p in new[label]["players"]}
+                touched |= {p for label in changed + removed if label in old for p in old[label]["players"]}
+                append = not removed and not any(label in old for label in changed)
+                update(season, name, clean, reference, changed, removed, touched, append)
+            print(f"{season} {name}: {len(changed)} changed, {len(removed)} removed partitions")
+
+        manifest["files"][name] = state
+        write_manifest(season, manifest)
+
+    write_manifest(season, dict(manifest, complete=True))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ratings, averages and centile totals of a season, updated for the new or changed game weeks only."
+    )
+    parser.add_argument("--season", default=list(SEASONS)[0], choices=list(SEASONS))
+    parser.add_argument("--reference", default="2024-2025", choices=list(SEASONS), help="season of the reference distributions")
+    parser.add_argument("--file", action="append", choices=list(RATINGS), help="default: players and goalkeepers")
+    parser.add_argument("--full", action="store_true", help="rebuild every output of the season")
+    args = parser.parse_args()
+    run(args.season, args.reference, args.file, args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import os
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from datalosc.store import CSV_FOLDER, SEASONS, season_path, store
+
+# Known homonyms and renamings, applied to the raw data before cleaning:
+# rows of `Player` (at `Team` / of `Nationality` when given) become `Name`.
+OVERRIDES_FILE = os.path.join(CSV_FOLDER, "player_overrides.csv")
+OVERRIDES_COLUMNS = ["Player", "Team", "Nationality", "Name"]
+# Stable integer ID of every known player, with the ages it was seen at.
+REGISTRY_FILE = os.path.join(CSV_FOLDER, "player_registry.csv")
+REGISTRY_COLUMNS = ["ID", "Key", "Nationality", "Min Age", "Max Age", "Player"]
+REGISTRY_DTYPES = {"ID": "int64", "Key": str, "Nationality": str, "Min Age": "float64", "Max Age": "float64", "Player": str}
+MAX_AGE_DIFF = 1
+# Season files listing every player, registered from the oldest season on:
+# the per-match ratings hold every age a player was seen at, the season
+# totals the players of older seasons without per-match outfield ratings.
+PLAYER_FILES = [
+    "players/ratings/data_players.csv", "players/ratings/data_goals.csv",
+    "players/centiles/data_players.csv", "players/centiles/data_goals.csv",
+]
+
+
+# ------------------------- Names -------------------------
+def normalize_name(name):
+    """Lower case, accents and repeated spaces removed: "Vítor  Vitinha" -> "vitor vitinha"."""
+    if pd.isna(name):
+        return ""
+    text = unicodedata.normalize("NFKD", str(name))
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).casefold().split())
+
+def nationality_codes(nationalities):
+    """Upper-case country code of raw ("uy URU") or clean ("URU") nationalities, "" when missing."""
+    return nationalities.fillna("").astype(str).str.split().str[-1].fillna("").str.upper()
+
+def _normalized(players):
+    uniques = pd.unique(players)
+    names = dict(zip(uniques, map(normalize_name, uniques)))
+    return players.map(names)
+
+
+# ------------------------- Overrides -------------------------
+def load_overrides(path=OVERRIDES_FILE):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=OVERRIDES_COLUMNS)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+def apply_overrides(df, overrides=None):
+    """Rename the players matched by the override table, a blank Team or Nationality matches any."""
+    overrides = load_overrides() if overrides is None else overrides
+    df = df.copy()
+    nationalities = nationality_codes(df["Nationality"]) if "Nationality" in df else None
+    for player, team, nationality, name in overrides[OVERRIDES_COLUMNS].itertuples(index=False):
+        mask = df["Player"] == player
+        if team:
+            mask &= df["Team"] == team
+        if nationality:
+            mask &= nationalities == nationality.upper()
+        df.loc[mask, "Player"] = name
+    return df
+
+
+# ------------------------- Identities -------------------------
+def identity_clusters(df, max_age_diff=MAX_AGE_DIFF):
+    """Identity code per row of a frame with Player, Nationality and Age.
+
+    Rows are bucketed on (normalized name, nationality) and, within a
+    bucket, ages at most `max_age_diff` apart are linked, so a birthday
+    during the season keeps one identity while homonyms of the same country
+    and different generations stay apart. Sorting once makes it O(n log n).
+    """
+    buckets = pd.factorize(_normalized(df["Player"]) + "\x1f" + nationality_codes(df["Nationality"]))[0]
+    age = df["Age"].astype(float).to_numpy()
+    order = np.lexsort((age, buckets))
+    bucket, age = buckets[order], age[order]
+    new = np.r_[True, (bucket[1:] != bucket[:-1]) | ~(np.diff(age) <= max_age_diff)]
+    clusters = np.empty(len(df), dtype=np.int64)
+    clusters[order] = np.cumsum(new) - 1
+    return clusters
+
+def identity_members(df, max_age_diff=MAX_AGE_DIFF):
+    """First row and rows of every identity of `df`, in the order of their first row."""
+    clusters = identity_clusters(df, max_age_diff)
+    order = np.argsort(clusters, kind="stable")
+    members = np.split(order, np.flatnonzero(np.diff(clusters[order])) + 1) if len(df) else []
+    members.sort(key=lambda rows: rows[0])
+    return [rows[0] for rows in members], members
+
+def mode_value(values):
+    """First of the most frequent non-null values once sorted, like Series.mode().iloc[0], else None."""
+    counts = Counter(v for v in values if not pd.isna(v))
+    if not counts:
+        return None
+    best = max(counts.values())
+    return min(v for v, count in counts.items() if count == best)
+
+def member_sums(series, members):
+    """Sum of a numeric column over every member list, with the same additions as Series.sum()."""
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+    else:
+        values = series.to_numpy()
+    if values.dtype == bool:
+        values = values.astype(np.int64)
+    elif np.issubdtype(values.dtype, np.floating):
+        values = np.where(np.isnan(values), 0, values)
+    # np.add.reduce over the rows of a (groups, size) matrix adds in the same
+    # order as a 1-D sum, so groups are summed size by size.
+    sums = [values.dtype.type(0)] * len(members)
+    sizes = np.array([len(m) for m in members])
+    for size in np.unique(sizes[sizes > 0]):
+        groups = np.flatnonzero(sizes == size)
+        totals = np.add.reduce(values[np.array([members[k] for k in groups])], axis=1)
+        for k, total in zip(groups, totals):
+            sums[k] = total
+    return sums
+
+
+# ------------------------- Registry -------------------------
+def read_registry(path=REGISTRY_FILE):
+    if not os.path.exists(path):
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in REGISTRY_DTYPES.items()})
+    return pd.read_csv(path, dtype=REGISTRY_DTYPES, keep_default_na=False, na_values={"Min Age": [""], "Max Age": [""]})
+
+def load_registry():
+    return store.derive("player registry", [REGISTRY_FILE], read_registry)
+
+def save_registry(registry, path=REGISTRY_FILE):
+    tmp_path = path + ".tmp"
+    registry = registry.astype({"Min Age": "Int64", "Max Age": "Int64"})
+    registry[REGISTRY_COLUMNS].to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def assign_player_ids(df, registry, max_age_diff=MAX_AGE_DIFF):
+    """Registry ID of every row of `df` and the registry extended with its new players.
+
+    An identity takes the ID of a registered player with the same name key
+    and nationality whose ages are within `max_age_diff` of its own (any
+    age when unknown), the smallest one if several match, else a new ID.
+    """
+    clusters = identity_clusters(df, max_age_diff)
+    age = df["Age"].astype(float)
+    identities = pd.DataFrame({
+        "Key": _normalized(df["Player"]).to_numpy(),
+        "Nationality": nationality_codes(df["Nationality"]).to_numpy(),
+        "Player": df["Player"].astype(str).to_numpy(),
+        "Min Age": age.to_numpy(),
+        "Max Age": age.to_numpy(),
+    }).groupby(clusters).agg({"Key": "first", "Nationality": "first", "Player": "first", "Min Age": "min", "Max Age": "max"})
+
+    candidates = identities.reset_index(names="cluster").merge(
+        registry[["ID", "Key", "Nationality", "Min Age", "Max Age"]], on=["Key", "Nationality"], suffixes=("", " Registered")
+    )
+    unknown = candidates["Min Age"].isna() | candidates["Min Age Registered"].isna()
+    overlap = (
+        (candidates["Min Age"] <= candidates["Max Age Registered"] + max_age_diff)
+        & (candidates["Min Age Registered"] <= candidates["Max Age"] + max_age_diff)
+    )
+    matched = candidates[unknown | overlap].groupby("cluster")["ID"].min()
+
+    ids = matched.reindex(identities.index)
+    new = ids.isna().to_numpy()
+    start = int(registry["ID"].max()) + 1 if len(registry) else 1
+    ids[new] = np.arange(start, start + new.sum())
+    ids = ids.astype(np.int64)
+
+    seen = identities.assign(ID=ids.to_numpy())
+    registry = pd.concat([registry, seen[new]], ignore_index=True)
+    ranges = pd.concat([registry[["ID", "Min Age", "Max Age"]], seen[~new][["ID", "Min Age", "Max Age"]]])
+    ranges = ranges.groupby("ID").agg({"Min Age": "min", "Max Age": "max"})
+    registry["Min Age"] = registry["ID"].map(ranges["Min Age"])
+    registry["Max Age"] = registry["ID"].map(ranges["Max Age"])
+    return ids.to_numpy()[clusters], registry[REGISTRY_COLUMNS]
+
+def provisional_ids(df):
+    """Negative ID from the name key and nationality, the same in every file, for unregistered players."""
+    keys = _normalized(df["Player"]) + "\x1f" + nationality_codes(df["Nationality"])
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return -(hashes >> np.uint64(1)).astype(np.int64) - 1
+
+def player_ids(df):
+    """Player ID of every row, read-only: players missing from the registry get provisional IDs."""
+    registry = load_registry()
+    ids, _ = assign_player_ids(df, registry)
+    new = ids > (registry["ID"].max() if len(registry) else 0)
+    if new.any():
+        ids[new] = provisional_ids(df[new])
+    return ids
+
+def with_player_ids(df):
+    return df.assign(**{"Player ID": player_ids(df)})
+
+def load_players(season, *files):
+    """Season files concatenated, with the Player ID of every row to join them on."""
+    paths = [season_path(season, f) for f in files]
+    return store.derive(
+        "players", paths + [REGISTRY_FILE],
+        lambda: with_player_ids(pd.concat([pd.read_csv(p) for p in paths], ignore_index=True))
+    )
+
+def register_players(df):
+    """Player ID of every row, saving the new players to the registry."""
+    registry = read_registry()
+    ids, updated = assign_player_ids(df, registry)
+    if not updated.equals(registry):
+        save_registry(updated)
+    return ids
+
+
+# ------------------------- CLI -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Register the players of every season, oldest first.")
+    parser.parse_args()
+    for season in reversed(list(SEASONS)):
+        frames = [pd.read_csv(season_path(season, f)) for f in PLAYER_FILES if os.path.exists(season_path(season, f))]
+        if frames:
+            players = pd.concat(frames, ignore_index=True)[["Player", "Nationality", "Age"]]
+            ids = register_players(players)
+            print(f"{season}: {len(set(ids))} players")
+    print(f"{len(read_registry())} players registered -> {REGISTRY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
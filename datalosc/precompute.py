@@ -0,0 +1,137 @@
+import argparse
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+
+from datalosc.simulation import LEAGUE_PHASE_MATCHES, compute_standing, remaining_fixtures, run_simulations
+from datalosc.store import SEASONS, exists, load_games, load_uefa_ranking, season_path, store
+
+# Bump when the simulation model changes so every stored result is recomputed.
+ENGINE_VERSION = 2
+DEFAULT_PARAMS = {"n": 10**5, "seed": 0, "proba_draw": 0.2}
+RESULT_KEYS = ["n", "outcomes", "points_by_outcome", "points_sum", "rounds", "seed"]
+
+
+# ------------------------- Keys -------------------------
+def file_hash(path):
+    def digest():
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    return store.derive("sha256", [path], digest)
+
+def games_path(season, league):
+    return season_path(season, "Leagues Games", f"{league}_games.csv")
+
+def ranking_path(season, league):
+    return season_path(season, "UEFA Leagues", f"Ranking {league}.csv")
+
+def params_hash(params):
+    params = dict(params, version=ENGINE_VERSION)
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def simulation_key(season, league, matches_played, params):
+    key = hashlib.sha256()
+    key.update(file_hash(games_path(season, league)).encode())
+    key.update(file_hash(ranking_path(season, league)).encode())
+    key.update(f"{matches_played}:{params_hash(params)}".encode())
+    return key.hexdigest()
+
+def result_path(season, league, matches_played, params):
+    return season_path(
+        season, "UEFA Leagues", "Simulations", f"{league}_J{matches_played}_{params_hash(params)[:12]}.npz"
+    )
+
+
+# ------------------------- Result store -------------------------
+def _read_result(path):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        result = {k: data[k] for k in RESULT_KEYS + ["key", "teams"]}
+    for k in ["n", "seed", "key"]:
+        result[k] = result[k].item()
+    return result
+
+def load_result(season, league, matches_played, params):
+    """Stored result for this state, or None when missing or out of date."""
+    path = result_path(season, league, matches_played, params)
+    result = store.derive("simulation", [path], lambda: _read_result(path))
+    if result is None or result["key"] != simulation_key(season, league, matches_played, params):
+        return None
+    return result
+
+def save_result(season, league, matches_played, params, teams, result):
+    path = result_path(season, league, matches_played, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        key=simulation_key(season, league, matches_played, params),
+        teams=np.array(teams),
+        **{k: result[k] for k in RESULT_KEYS},
+    )
+    os.replace(tmp_path, path)
+
+
+# ------------------------- Simulation -------------------------
+def league_phase_inputs(season, league, matches_played):
+    no_matches = LEAGUE_PHASE_MATCHES[league]
+    matches = load_games(season, league)[:no_matches * 18]
+    ranking = load_uefa_ranking(season, league)
+    standing = compute_standing(matches, matches_played)
+    teams = standing["Team"].tolist()
+    coefficients = ranking.set_index("Team")["Pts"].reindex(teams).to_numpy(dtype=float)
+    home, away = remaining_fixtures(matches, teams, matches_played)
+    return standing, teams, standing["Pts"].to_numpy(), home, away, coefficients
+
+def simulate_state(season, league, matches_played, params, workers=1):
+    """Stored result of a league-phase state, simulated and stored on a miss."""
+    standing, teams, points, home, away, coefficients = league_phase_inputs(season, league, matches_played)
+    result = load_result(season, league, matches_played, params)
+    if result is None:
+        result = run_simulations(
+            points, home, away, coefficients, params["proba_draw"], params["n"],
+            3 * LEAGUE_PHASE_MATCHES[league], seed=params["seed"], workers=workers
+        )
+        try:
+            save_result(season, league, matches_played, params, teams, result)
+        except OSError as e:
+            # Still usable, but this state is simulated again on every call until the store is writable.
+            warnings.warn(f"{season} {league} J{matches_played}: simulation result not stored ({e})")
+    return result
+
+
+# ------------------------- Batch -------------------------
+def precompute(seasons, leagues, params, workers=1):
+    for season in seasons:
+        for league in leagues:
+            if not exists(season, "UEFA Leagues", f"Ranking {league}.csv"):
+                print(f"{season} {league}: no UEFA ranking, skipped")
+                continue
+            matches = load_games(season, league)[:LEAGUE_PHASE_MATCHES[league] * 18]
+            if len(set(matches["Home Team"])) != 36:
+                print(f"{season} {league}: not a 36-team league phase, skipped")
+                continue
+            for matches_played in range(LEAGUE_PHASE_MATCHES[league] + 1):
+                cached = load_result(season, league, matches_played, params) is not None
+                simulate_state(season, league, matches_played, params, workers)
+                print(f"{season} {league} J{matches_played}: {'up to date' if cached else 'simulated'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the UEFA league-phase simulations.")
+    parser.add_argument("--season", action="append", choices=list(SEASONS), help="default: every season")
+    parser.add_argument("--league", action="append", choices=list(LEAGUE_PHASE_MATCHES), help="default: every league")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_PARAMS["n"])
+    parser.add_argument("--seed", type=int, default=DEFAULT_PARAMS["seed"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    params = dict(DEFAULT_PARAMS, n=args.simulations, seed=args.seed)
+    precompute(args.season or list(SEASONS), args.league or list(LEAGUE_PHASE_MATCHES), params, args.workers)
+
+
+if __name__ == "__main__":
+    main()
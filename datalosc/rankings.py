@@ -0,0 +1,169 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from datalosc.ratings import load_centile_tensor, tensor_ratings
+from datalosc.store import load, season_path, store
+
+RATINGS_FILES = ["players/ratings/data_players.csv", "players/ratings/data_goals.csv"]
+# Summaries answered per selection: the sorted list of values, the mode,
+# the max or the first value in file order.
+CATEGORIES = {
+    "Team": "list",
+    "League": "list",
+    "Position": "mode",
+    "General Position": "mode",
+    "Age": "max",
+    "Nationality": "first",
+}
+
+
+def matchday_number(j):
+    match = re.match(r"J(\d+)", str(j))
+    return int(match.group(1)) if match else -1
+
+
+# ------------------------- Cube -------------------------
+def _prefix_sums(pair_codes, week_codes, values, n_weeks):
+    """Cumulative sums over the weeks of every distinct pair code, shape (pairs, weeks + 1, ...)."""
+    pairs, inverse = np.unique(pair_codes, return_inverse=True)
+    grid = np.zeros((len(pairs), n_weeks + 1) + values.shape[1:])
+    np.add.at(grid, (inverse, week_codes + 1), values)
+    return pairs, np.cumsum(grid, axis=1)
+
+def build_rating_cube(df):
+    """Per (player, league) and per (player, league, category value) cumulative totals over the game weeks.
+
+    Players, leagues and category values are integer codes in sorted order,
+    so the smallest code of a tie is the value pandas' mode would return.
+    """
+    weeks = sorted(df["Game Week"].dropna().unique(), key=matchday_number)
+    players = np.sort(df["Player"].dropna().unique())
+    leagues = np.sort(df["League"].dropna().unique())
+
+    player = pd.Categorical(df["Player"], categories=players).codes.astype(np.int64)
+    league = pd.Categorical(df["League"], categories=leagues).codes.astype(np.int64)
+    week = pd.Categorical(df["Game Week"], categories=weeks).codes.astype(np.int64)
+    valid = (player >= 0) & (league >= 0) & (week >= 0)
+    df, player, league, week = df[valid], player[valid], league[valid], week[valid]
+    pair = player * len(leagues) + league
+
+    # Ratings have at most two decimals: summing them in hundredths keeps the
+    # prefix differences exact.
+    rating = df["Rating"].to_numpy(dtype=float)
+    minutes = df["Minutes"].to_numpy(dtype=float)
+    values = np.stack([
+        np.round(np.nan_to_num(rating) * 100), ~np.isnan(rating), np.ones(len(df)), np.nan_to_num(minutes)
+    ], axis=1)
+    pairs, totals = _prefix_sums(pair, week, values, len(weeks))
+
+    categories = {}
+    for column, summary in CATEGORIES.items():
+        codes, uniques = pd.factorize(df[column], sort=True)
+        keep = codes >= 0
+        if summary == "first":
+            # The first value in file order can't come from prefix sums, keep
+            # the rows' codes and take the first selected row per player.
+            categories[column] = (np.asarray(uniques), np.stack([player, league, week, codes])[:, keep])
+            continue
+        cat_pairs, counts = _prefix_sums(
+            pair[keep] * len(uniques) + codes[keep], week[keep], np.ones(keep.sum()), len(weeks)
+        )
+        categories[column] = (np.asarray(uniques), cat_pairs, counts)
+
+    return {
+        "weeks": weeks,
+        "players": players,
+        "leagues": leagues,
+        "pairs": pairs,
+        "totals": totals,
+        "categories": categories,
+    }
+
+def load_rating_cube(season):
+    paths = [season_path(season, f) for f in RATINGS_FILES]
+    return store.derive(
+        "rating cube", paths,
+        lambda: build_rating_cube(pd.concat([pd.read_csv(p) for p in paths], ignore_index=True))
+    )
+
+def profile_rating_cube(season, profiles):
+    """Rating cube with the files of `profiles` ({file name: {group: {stat: weight}}}) rated again from their centile tensor."""
+    frames = []
+    for path in RATINGS_FILES:
+        name = os.path.basename(path)
+        if name in profiles:
+            frames.append(tensor_ratings(load_centile_tensor(season, name), profiles[name]))
+        else:
+            frames.append(load(season, path))
+    return build_rating_cube(pd.concat(frames, ignore_index=True))
+
+
+# ------------------------- Queries -------------------------
+def _window(cumulative, first, last):
+    return cumulative[:, last + 1] - cumulative[:, first]
+
+def _category_counts(cube, column, league_mask, first, last):
+    """Matches per (player, value) in the selection, shape (players, values)."""
+    uniques, pairs, counts = cube["categories"][column]
+    n_values = len(uniques)
+    league = pairs // n_values % len(cube["leagues"])
+    keep = league_mask[league]
+    player_value = pairs[keep] // (n_values * len(cube["leagues"])) * n_values + pairs[keep] % n_values
+    window = _window(counts[keep], first, last)
+    grid = np.bincount(player_value, weights=window, minlength=len(cube["players"]) * n_values)
+    return grid.reshape(len(cube["players"]), n_values)
+
+def aggregate_players(cube, leagues, first, last):
+    """Per-player summary of the selected leagues and game weeks `first`..`last` (positions in cube["weeks"]).
+
+    Same columns as the former groupby("Player") aggregation.
+    """
+    league_mask = np.isin(cube["leagues"], list(leagues))
+    league = cube["pairs"] % len(cube["leagues"])
+    player = cube["pairs"] // len(cube["leagues"])
+    keep = league_mask[league]
+    window = _window(cube["totals"][keep], first, last)
+    totals = np.stack([
+        np.bincount(player[keep], weights=window[:, i], minlength=len(cube["players"]))
+        for i in range(window.shape[1])
+    ], axis=1)
+    rows = np.flatnonzero(totals[:, 2] > 0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rating = totals[rows, 0] / totals[rows, 1] / 100
+    df = pd.DataFrame({"Player": cube["players"][rows]})
+
+    for column, summary in CATEGORIES.items():
+        uniques = cube["categories"][column][0]
+        if summary == "first":
+            player_rows, league_rows, week_rows, codes = cube["categories"][column][1]
+            selected = league_mask[league_rows] & (week_rows >= first) & (week_rows <= last)
+            owners, first_index = np.unique(player_rows[selected], return_index=True)
+            values = pd.Series(uniques[codes[selected][first_index]], index=owners)
+            df[column] = values.reindex(rows).to_numpy()
+            continue
+
+        counts = _category_counts(cube, column, league_mask, first, last)[rows]
+        present = counts > 0
+        if summary == "list":
+            owners, codes = np.nonzero(present)
+            splits = np.searchsorted(owners, np.arange(1, len(rows)))
+            df[column] = [list(values) for values in np.split(uniques[codes], splits)]
+        elif summary == "mode":
+            values = uniques[counts.argmax(axis=1)].astype(object)
+            values[~present.any(axis=1)] = None
+            df[column] = values
+        else:
+            values = uniques[present.shape[1] - 1 - present[:, ::-1].argmax(axis=1)]
+            if not present.any(axis=1).all():
+                values = values.astype(float)
+                values[~present.any(axis=1)] = np.nan
+            df[column] = values
+
+    df["Rating"] = rating
+    df["Matches"] = totals[rows, 2].astype(int)
+    df["Minutes"] = totals[rows, 3]
+    return df[["Player"] + list(CATEGORIES)[:5] + ["Rating", "Matches", "Minutes", "Nationality"]]
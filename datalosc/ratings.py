@@ -0,0 +1,578 @@
+import argparse
+import ast
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from datalosc.players import identity_members, member_sums, mode_value
+from datalosc.store import SEASONS, file_signature, season_path, store
+
+NOTE_MAX = 10
+OUTPUT_COLUMNS = [
+    "Player", "Game Week", "Position", "General Position", "Team", "League", "Minutes", "Rating", "Age", "Nationality"
+]
+# Reference artifact: magic, format version, JSON header length, JSON header
+# (offsets of every sorted array), then little-endian float64 values.
+REFERENCE_MAGIC = b"DLOSCREF"
+REFERENCE_VERSION = 1
+REFERENCE_ALIGN = 64
+# Goalkeepers are compared with every goalkeeper, outfield players per position.
+ALL_PLAYERS = "All"
+EMPTY = np.empty(0)
+
+
+# ------------------------- Indices -------------------------
+def get_position_indices(position):
+    if position in ['AM', 'LW', 'RW']:
+        return (
+            [
+                "Expected Goals (xG)",
+                "Shots on Target",
+                "Shots Total",
+                "Goal-Creating Actions (GCA)",
+                "Shot-Creating Actions (SCA)",
+                "Key Passes",
+                "Expected Assists (xA)",
+                "Passes into Penalty Area",
+                "Passes into Final Third",
+                "Carries into Penalty Area",
+                "Carries into Final Third",
+                "Progressive Passes",
+                "Progressive Carries",
+                "Successful Take-Ons",
+                "Passes Received",
+                "Touches in Attacking Third",
+                "Touches in Attacking Penalty Area",
+                "Offsides"
+            ],
+            [
+                "Offsides"
+            ],
+            [4, 2.5, 2, 3, 3, 3, 4, 3.5, 2.5, 2.5, 2.5, 3, 3, 4, 1.5, 4, 3, 1]
+        )
+
+    elif position in ['LM', 'RM', 'CM', 'DM', 'WB']:
+        return (
+            [
+                "Passes Completed",
+                "Progressive Passes",
+                "Passes into Final Third",
+                "Passes Attempted",
+                "Interceptions",
+                "Tackles",
+                "Progressive Carries",
+                "Carries into Final Third",
+                "Key Passes",
+                "Blocks",
+                "Switches",
+                "Ball Recoveries",
+                "Dribblers Tackled",
+                "Successful Take-Ons",
+                "Passes into Penalty Area",
+                "Ball Losses",
+                "Errors Leading to Shot"
+            ],
+            [
+                "Ball Losses",
+                "Errors Leading to Shot"
+            ],
+            [2, 3, 2, 1.5, 3, 3, 2.5, 3, 3, 2, 2, 4, 3, 1.5, 2, 1, 2]
+        )
+
+    elif position in ['LB', 'RB', 'CB']:
+        # 19 stats for 18 weights: like the notebook's zip(), "Ball Losses" is not rated.
+        return (
+            [
+                "Tackles",
+                "Interceptions",
+                "Clearances",
+                "Blocks",
+                "Aerials Won",
+                "Ball Recoveries",
+                "Dribblers Tackled",
+                "Tackles in Defensive Third",
+                "Passes Completed",
+                "Progressive Passes",
+                "Touches in Defensive Third",
+                "Progressive Carries",
+                "Passes Attempted",
+                "Touches in Defensive Penalty Area",
+                "Passes Blocked",
+                "Errors Leading to Shot",
+                "Own Goals",
+                "Fouls Committed",
+                "Ball Losses"
+            ],
+            [
+                "Errors Leading to Shot",
+                "Own Goals",
+                "Fouls Committed",
+                "Ball Losses"
+            ],
+            [3, 3, 2.5, 3, 4, 3, 2, 2, 4, 4, 4, 2, 3, 4, 3, 1, 1, 1]
+        )
+
+    else:
+        raise ValueError(f"Poste inconnu ou non géré : {position}")
+
+def get_goalkeeper_indices():
+    indices_comp = [
+        'Goals Against',
+        'Save Efficiency',
+        'Saves',
+        'Completed Long Passes',
+        'Crosses Stopped',
+        'Defensive Actions Outside Penalty Area'
+    ]
+    indices_neg = [
+        'Goals Against'
+    ]
+    coeff_indices = [0, 5, 2, 2, 1, 1]
+    return indices_comp, indices_neg, coeff_indices
+
+
+# ------------------------- Engine -------------------------
+def reference_distributions(reference, indices):
+    """Sorted non-null reference values of every stat, computed once."""
+    return {stat: np.sort(reference[stat].dropna().to_numpy(dtype=float)) for stat in indices}
+
+def position_distributions(reference):
+    """Sorted reference values per position and stat of the outfield players' clean data."""
+    return {
+        position: reference_distributions(reference[reference["Position"] == position], get_position_indices(position)[0])
+        for position in pd.unique(reference["Position"].dropna())
+    }
+
+def goalkeeper_distributions(reference):
+    return {ALL_PLAYERS: reference_distributions(reference, get_goalkeeper_indices()[0])}
+
+def centile_counts(values, sorted_values, negative, inclusive):
+    """Number of reference values below `values` (above for negative stats), for all rows at once."""
+    if negative:
+        return len(sorted_values) - np.searchsorted(sorted_values, values, side="left" if inclusive else "right")
+    return np.searchsorted(sorted_values, values, side="right" if inclusive else "left")
+
+def centiles(values, sorted_values, negative, inclusive):
+    """Share of the reference below `values` (above for negative stats), 0 for missing values."""
+    centile = centile_counts(values, sorted_values, negative, inclusive) / len(sorted_values)
+    centile[np.isnan(values)] = 0
+    return centile
+
+def weighted_centiles(data, factor, indices, negative_indices, weights, distributions, inclusive):
+    """Weighted centile sum and whether any stat was rated, per row.
+
+    Stats are added in the order of `indices` so the sums are bit-identical
+    to the notebook's loop; a stat needs at least 3 reference values.
+    """
+    total = np.zeros(len(data))
+    rated = np.zeros(len(data), dtype=bool)
+    for stat, coeff in zip(indices, weights):
+        sorted_values = distributions.get(stat, EMPTY)
+        if len(sorted_values) < 3:
+            continue
+        raw = data[stat].to_numpy(dtype=float)
+        present = ~np.isnan(raw)
+        centile = centiles(raw * factor, sorted_values, stat in negative_indices, inclusive)
+        total = total + np.where(present, centile * coeff, 0)
+        rated |= present
+    return total, rated
+
+def _minutes(data):
+    minutes = data["Minutes"]
+    data = data[~(minutes < 0)]
+    minutes = data["Minutes"].mask(data["Minutes"] == 0, 1)
+    return data.assign(Minutes=minutes), 90 / minutes.to_numpy(dtype=float)
+
+def _player_bonus(data):
+    goals = data["Goals"].to_numpy(dtype=float) if "Goals" in data else np.zeros(len(data))
+    assists = data["Assists"].to_numpy(dtype=float) if "Assists" in data else np.zeros(len(data))
+    expected_assists = data["Expected Assists (xA)"].to_numpy(dtype=float) if "Expected Assists (xA)" in data else np.zeros(len(data))
+    # Python's max(): xA only wins when it is strictly greater, NaN Assists stays NaN.
+    best_assists = np.where(expected_assists > assists, expected_assists, assists)
+    return 1 + 0.05*goals + 0.05*best_assists
+
+def _goalkeeper_bonus(data):
+    clean_sheets = data["Clean Sheets"].to_numpy(dtype=float) if "Clean Sheets" in data else np.zeros(len(data))
+    return 1 + 0.05*clean_sheets
+
+def _results(data, rating, rated, decimals, note_max):
+    rating = np.minimum(np.maximum(rating, 0), note_max)
+    results = data.assign(Player=data.index, Rating=rating)[rated]
+    results = results[OUTPUT_COLUMNS].reset_index(drop=True)
+    results["Rating"] = results["Rating"].round(decimals)
+    return results
+
+def rate_players(data, reference, note_max=NOTE_MAX):
+    """Ratings of outfield players (Player as index).
+
+    `reference` maps position -> stat -> sorted values (see load_reference),
+    a clean data frame is grouped on the fly.
+    """
+    if isinstance(reference, pd.DataFrame):
+        reference = position_distributions(reference)
+    data, factor = _minutes(data)
+    rating = np.zeros(len(data))
+    rated = np.zeros(len(data), dtype=bool)
+    positions = data["Position"].to_numpy()
+
+    for position in pd.unique(positions):
+        rows = positions == position
+        indices, negative_indices, weights = get_position_indices(position)
+        distributions = reference.get(position, {})
+        total, rated[rows] = weighted_centiles(
+            data[rows], factor[rows], indices, negative_indices, weights, distributions, inclusive=False
+        )
+        rating[rows] = note_max * total / sum(weights)
+
+    rating = rating * _player_bonus(data)
+    return _results(data, rating, rated, 1, note_max)
+
+def rate_goalkeepers(data, reference, note_max=NOTE_MAX):
+    """Ratings of goalkeepers (Player as index) against every goalkeeper of `reference`."""
+    if isinstance(reference, pd.DataFrame):
+        reference = goalkeeper_distributions(reference)
+    data, factor = _minutes(data)
+    indices, negative_indices, weights = get_goalkeeper_indices()
+    distributions = reference.get(ALL_PLAYERS, {})
+    total, rated = weighted_centiles(data, factor, indices, negative_indices, weights, distributions, inclusive=True)
+    rating = note_max * total / sum(weights)
+
+    rating = rating * _goalkeeper_bonus(data)
+    return _results(data, rating, rated, 2, note_max)
+
+
+# ------------------------- Averages -------------------------
+def get_average_scores(df):
+    df = df.dropna(subset=['Rating', 'Minutes'])
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce')
+    df['Minutes'] = pd.to_numeric(df['Minutes'], errors='coerce')
+    df = df[df['Minutes'] > 0]
+
+    df["Matches"] = 1
+
+    grouped = df.groupby(["Player", "Age"]).agg({
+        "Rating": 'sum',
+        "Minutes": 'sum',
+        "Matches": 'sum',
+        "Team": lambda x: ', '.join(sorted(set(x))),
+        "League": lambda x: ', '.join(sorted(set(x))),
+        "Position": lambda x: x.mode().iloc[0] if not x.mode().empty else None,
+        "General Position": lambda x: x.mode().iloc[0] if not x.mode().empty else None,
+        "Nationality": "first"
+    }).reset_index()
+
+    return grouped
+
+def _leagues(entries):
+    leagues = set()
+    for league_entry in entries:
+        if isinstance(league_entry, list):
+            leagues.update(league_entry)
+        elif isinstance(league_entry, str) and league_entry.startswith("["):
+            try:
+                leagues.update(ast.literal_eval(league_entry))
+            except (ValueError, SyntaxError):
+                leagues.add(league_entry)
+        elif isinstance(league_entry, str):
+            leagues.update([l.strip() for l in league_entry.split(",") if l.strip()])
+        else:
+            leagues.add(league_entry)
+    return ', '.join(sorted(leagues))
+
+def merge_similar_players(df, max_age_diff=1):
+    """One row per player and nationality whose ages are at most `max_age_diff` apart."""
+    df = df.sort_values(by=["Player", "Age"]).reset_index(drop=True)
+    heads, members = identity_members(df, max_age_diff)
+    columns = {col: df[col].to_numpy() for col in df.columns}
+    sums = {col: member_sums(df[col], members) for col in ["Rating", "Minutes", "Matches"]}
+
+    merged_rows = []
+    for k, (i, rows) in enumerate(zip(heads, members)):
+        new_row = {}
+        new_row["Player"] = columns["Player"][i]
+        teams = [t.strip() for x in columns["Team"][rows] if not pd.isna(x) for t in str(x).split(',')]
+        new_row["Team"] = ', '.join(sorted(set(teams)))
+        new_row["League"] = _leagues(columns["League"][rows])
+        for col in ["Position", "General Position", "Nationality"]:
+            new_row[col] = mode_value(columns[col][rows])
+        new_row["Age"] = int(columns["Age"][rows].max())
+        for col in ["Rating", "Minutes", "Matches"]:
+            new_row[col] = sums[col][k]
+        new_row["Average Rating"] = round(new_row["Rating"] / new_row["Matches"], 2) if new_row["Matches"] > 0 else None
+        merged_rows.append(new_row)
+
+    df_merged = pd.DataFrame(merged_rows).round(2)
+
+    for col in ["Minutes", "Age"]:
+        if col in df_merged.columns:
+            df_merged[col] = df_merged[col].astype("Int64")
+
+    return df_merged
+
+def average_ratings(ratings):
+    """Season summary per player of a ratings file read with Player as index."""
+    return merge_similar_players(get_average_scores(ratings), max_age_diff=1)
+
+
+# ------------------------- Reference artifact -------------------------
+RATINGS = {
+    "data_players.csv": rate_players,
+    "data_goals.csv": rate_goalkeepers,
+}
+DISTRIBUTIONS = {
+    "data_players.csv": position_distributions,
+    "data_goals.csv": goalkeeper_distributions,
+}
+
+def clean_path(season, name):
+    return season_path(season, "players", "clean", name)
+
+def reference_path(season, name):
+    return season_path(season, "players", "reference", name.replace(".csv", ".ref"))
+
+def write_reference(path, distributions, source=""):
+    """Store the sorted arrays of `distributions` ({group: {stat: values}}) in one binary file."""
+    groups, offset, arrays = {}, 0, []
+    for group, stats in distributions.items():
+        groups[group] = {}
+        for stat, values in stats.items():
+            values = np.asarray(values, dtype="<f8")
+            groups[group][stat] = [offset, len(values)]
+            arrays.append(values)
+            offset += len(values)
+    header = json.dumps({"source": source, "groups": groups}, ensure_ascii=False).encode()
+    start = len(REFERENCE_MAGIC) + 8 + len(header)
+    padding = -start % REFERENCE_ALIGN
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(REFERENCE_MAGIC + struct.pack("<II", REFERENCE_VERSION, len(header) + padding))
+        f.write(header + b" " * padding)
+        for values in arrays:
+            f.write(values.tobytes())
+    os.replace(tmp_path, path)
+
+def read_reference(path):
+    """{group: {stat: sorted values}} as read-only views on a memory map of the file."""
+    with open(path, "rb") as f:
+        magic = f.read(len(REFERENCE_MAGIC))
+        version, length = struct.unpack("<II", f.read(8))
+        if magic != REFERENCE_MAGIC or version != REFERENCE_VERSION:
+            raise ValueError(f"{path}: not a version {REFERENCE_VERSION} rating reference")
+        header = json.loads(f.read(length))
+    start = len(REFERENCE_MAGIC) + 8 + length
+    if os.path.getsize(path) == start:
+        values = EMPTY
+    else:
+        values = np.memmap(path, dtype="<f8", mode="r", offset=start)
+    return {
+        group: {stat: values[offset:offset + count] for stat, (offset, count) in stats.items()}
+        for group, stats in header["groups"].items()
+    }
+
+def reference_version(path):
+    with open(path, "rb") as f:
+        if f.read(len(REFERENCE_MAGIC)) != REFERENCE_MAGIC:
+            return None
+        return struct.unpack("<I", f.read(4))[0]
+
+def build_reference(season, name):
+    source = clean_path(season, name)
+    path = reference_path(season, name)
+    write_reference(path, DISTRIBUTIONS[name](pd.read_csv(source)), os.path.relpath(source, season_path(season)))
+    return path
+
+def load_reference(season, name):
+    """Reference distributions of a season's clean file, written first when missing or out of date."""
+    path = reference_path(season, name)
+    source = file_signature(clean_path(season, name))
+    artifact = file_signature(path)
+    stale = artifact is None or (source is not None and source[0] > artifact[0])
+    if stale or reference_version(path) != REFERENCE_VERSION:
+        if source is None:
+            raise FileNotFoundError(f"No rating reference for {season} {name}")
+        build_reference(season, name)
+    return store.derive("rating reference", [path], lambda: read_reference(path))
+
+
+# ------------------------- Centile tensor -------------------------
+# Outfield positions sharing a rating formula.
+POSITION_GROUPS = [["AM", "LW", "RW"], ["LM", "RM", "CM", "DM", "WB"], ["LB", "RB", "CB"]]
+TENSOR_COLUMNS = [col for col in OUTPUT_COLUMNS if col != "Rating"]
+TENSOR_FILES = {
+    "data_players.csv": (False, _player_bonus, 1),
+    "data_goals.csv": (True, _goalkeeper_bonus, 2),
+}
+
+def tensor_path(season, name):
+    return season_path(season, "players", "ratings", name.replace(".csv", "_centiles.npz"))
+
+def default_profile(groups):
+    """{group: {stat: weight}} of the rating formulas, a group being a position or ALL_PLAYERS (goalkeepers)."""
+    profile = {}
+    for group in groups:
+        indices, _, weights = get_goalkeeper_indices() if group == ALL_PLAYERS else get_position_indices(group)
+        profile[group] = dict(zip(indices, weights))
+    return profile
+
+def build_centile_tensor(data, reference, name):
+    """Centile counts of every rated stat of the rated player-matches of `data` (Player as index).
+
+    Rows are those of the ratings file, a (group, stat) reference size of 0
+    masks the stats a group does not rate. Counts are stored in the smallest
+    unsigned type holding the reference sizes.
+    """
+    goalkeepers, bonus, decimals = TENSOR_FILES[name]
+    if isinstance(reference, pd.DataFrame):
+        reference = DISTRIBUTIONS[name](reference)
+    data, factor = _minutes(data)
+    groups = np.full(len(data), ALL_PLAYERS, dtype=object) if goalkeepers else data["Position"].to_numpy()
+    names = list(pd.unique(groups))
+    profile = default_profile(names)
+    stats = list(dict.fromkeys(stat for group in names for stat in profile[group]))
+    codes = pd.Index(names).get_indexer(groups)
+
+    counts = np.zeros((len(data), len(stats)), dtype=np.int64)
+    sizes = np.zeros((len(names), len(stats)), dtype=np.int64)
+    rated = np.zeros(len(data), dtype=bool)
+    for g, group in enumerate(names):
+        rows = codes == g
+        negative_indices = (get_goalkeeper_indices() if goalkeepers else get_position_indices(group))[1]
+        distributions = reference.get(group, {})
+        for stat in profile[group]:
+            sorted_values = distributions.get(stat, EMPTY)
+            if len(sorted_values) < 3:
+                continue
+            j = stats.index(stat)
+            raw = data[stat].to_numpy(dtype=float)[rows]
+            present = ~np.isnan(raw)
+            count = centile_counts(raw * factor[rows], sorted_values, stat in negative_indices, goalkeepers)
+            counts[rows, j] = np.where(present, count, 0)
+            sizes[g, j] = len(sorted_values)
+            rated[rows] |= present
+
+    return {
+        "columns": data.assign(Player=data.index)[TENSOR_COLUMNS][rated].reset_index(drop=True),
+        "counts": counts[rated].astype(np.min_scalar_type(sizes.max(initial=0))),
+        "stats": stats,
+        "groups": names,
+        "group": codes[rated],
+        "sizes": sizes,
+        "bonus": bonus(data)[rated],
+        "decimals": decimals,
+    }
+
+def write_centile_tensor(path, tensor):
+    arrays = {
+        "counts": tensor["counts"], "stats": np.array(tensor["stats"]), "groups": np.array(tensor["groups"]),
+        "group": tensor["group"], "sizes": tensor["sizes"], "bonus": tensor["bonus"], "decimals": tensor["decimals"],
+        "columns": np.array(TENSOR_COLUMNS),
+    }
+    # Text columns as codes of their sorted distinct values, -1 when missing.
+    for col, values in tensor["columns"].items():
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            codes, uniques = pd.factorize(values, sort=True)
+            arrays[f"codes:{col}"], arrays[f"values:{col}"] = codes.astype(np.int32), np.array(uniques, dtype=str)
+        else:
+            arrays[f"values:{col}"] = values.to_numpy()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+def read_centile_tensor(path):
+    """Tensor of `path`, with the float centile matrix of its counts computed once."""
+    with np.load(path) as npz:
+        arrays = dict(npz)
+    columns = {}
+    for col in arrays["columns"]:
+        values = arrays[f"values:{col}"]
+        if f"codes:{col}" in arrays:
+            codes = arrays[f"codes:{col}"]
+            values = np.where(codes >= 0, values.astype(object)[codes], np.nan) if len(values) else np.full(len(codes), np.nan, dtype=object)
+        columns[str(col)] = values
+    tensor = {
+        "columns": pd.DataFrame(columns),
+        "counts": arrays["counts"],
+        "stats": [str(stat) for stat in arrays["stats"]],
+        "groups": [str(group) for group in arrays["groups"]],
+        "group": arrays["group"],
+        "sizes": arrays["sizes"],
+        "bonus": arrays["bonus"],
+        "decimals": int(arrays["decimals"]),
+    }
+    sizes = tensor["sizes"][tensor["group"]]
+    tensor["centiles"] = np.divide(tensor["counts"], sizes, out=np.zeros(sizes.shape), where=sizes > 0)
+    return tensor
+
+def load_centile_tensor(season, name):
+    path = tensor_path(season, name)
+    return store.derive("centile tensor", [path], lambda: read_centile_tensor(path))
+
+def profile_ratings(tensor, profile, note_max=NOTE_MAX):
+    """Ratings of every row of `tensor` with the {group: {stat: weight}} weights of `profile`.
+
+    The weights of all groups form one (groups, stats) matrix, so the
+    weighted centile sums of every row and group are one matrix product.
+    """
+    position = {stat: j for j, stat in enumerate(tensor["stats"])}
+    weights = np.zeros((len(tensor["groups"]), len(position)))
+    totals = np.zeros(len(tensor["groups"]))
+    for g, group in enumerate(tensor["groups"]):
+        for stat, weight in profile[group].items():
+            if stat in position:
+                weights[g, position[stat]] = weight
+        totals[g] = sum(profile[group].values())
+
+    rows = np.arange(len(tensor["group"]))
+    total = (tensor["centiles"] @ weights.T)[rows, tensor["group"]]
+    group_totals = totals[tensor["group"]]
+    rating = np.divide(note_max * total, group_totals, out=np.zeros(len(total)), where=group_totals != 0)
+    rating = np.minimum(np.maximum(rating * tensor["bonus"], 0), note_max)
+    return np.round(rating, tensor["decimals"])
+
+def tensor_ratings(tensor, profile, note_max=NOTE_MAX):
+    """Ratings file rows of `tensor` rated with `profile`."""
+    df = tensor["columns"].copy()
+    df.insert(OUTPUT_COLUMNS.index("Rating"), "Rating", profile_ratings(tensor, profile, note_max))
+    return df
+
+
+# ------------------------- CLI -------------------------
+def rate_season(season, reference_season, files=None):
+    for name in files or list(RATINGS):
+        source = clean_path(season, name)
+        if not os.path.exists(source):
+            print(f"{season} {name}: no clean data, skipped")
+            continue
+        data = pd.read_csv(source, index_col=0)
+        reference = load_reference(reference_season, name)
+        notes = RATINGS[name](data, reference)
+        notes.to_csv(season_path(season, "players", "ratings", name), index=False)
+        write_centile_tensor(tensor_path(season, name), build_centile_tensor(data, reference, name))
+        print(f"{season} {name}: {len(notes)} ratings")
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate every player-match of a season from its clean data.")
+    parser.add_argument("--season", default=list(SEASONS)[0], choices=list(SEASONS))
+    parser.add_argument("--reference", default="2024-2025", choices=list(SEASONS), help="season of the reference distributions")
+    parser.add_argument("--file", action="append", choices=list(RATINGS), help="default: players and goalkeepers")
+    parser.add_argument("--build-reference", action="store_true", help="only write the season's reference artifacts")
+    args = parser.parse_args()
+
+    if args.build_reference:
+        for name in args.file or list(RATINGS):
+            if os.path.exists(clean_path(args.season, name)):
+                print(f"{args.season} {name}: -> {build_reference(args.season, name)}")
+        return
+    rate_season(args.season, args.reference, args.file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,838 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import urlsplit, urlunsplit
+
+import pandas as pd
+import requests
+from pandas.io.parsers import TextParser
+
+from datalosc.pagecache import PageCache, ReplayFetcher
+from datalosc.store import SEASONS, season_path
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/17.0"
+)
+# fbref asks for at most 10 requests a minute.
+DEFAULT_RATE = 10 / 60
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 10
+MAX_BACKOFF = 300
+# Pages served with a 200 in a browser instead of the page asked for: fbref's
+# rate limit page (a 429 over HTTP) and the bot checks in front of it.
+BLOCKED_PAGES = {
+    "Rate Limited Request": 60,
+    "429 error": 60,
+    "Just a moment...": DEFAULT_BACKOFF,
+    "Attention Required!": DEFAULT_BACKOFF,
+}
+# League of every schedule, in the order the matches are numbered.
+MATCH_LEAGUES = [
+    "Italian Serie A", "French Ligue 1", "German Bundesliga", "English Premier League", "Spanish La Liga",
+    "UEFA Champions League", "UEFA Europa League", "UEFA Europa Conference League",
+]
+RAW_FILES = ["data_players", "data_goals", "data_teams"]
+MANIFEST_FILE = "scrape_manifest.jsonl"
+# A failed match is retried after an hour, then 2, 4... at most once a day.
+RETRY_AFTER = timedelta(hours=1)
+MAX_RETRY_AFTER = timedelta(days=1)
+
+
+class RetryableError(Exception):
+    """A response worth retrying (429, 5xx), with the server's Retry-After in seconds when given."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+def check_page(url, page):
+    """`page`, unless it is a rate limit or bot check page, raised as a RetryableError."""
+    title = _TITLE.search(page)
+    title = title.group(1) if title else ""
+    for marker, retry_after in BLOCKED_PAGES.items():
+        if marker in title or (marker == "Rate Limited Request" and marker in page):
+            raise RetryableError(f"{url}: {marker}", retry_after)
+    return page
+
+
+# ------------------------- Rate limit -------------------------
+class TokenBucket:
+    """`rate` requests per second on average and bursts of at most `capacity`, shared by every thread."""
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds` (a 429 slows the whole pool, not one thread)."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+# ------------------------- Clients -------------------------
+class HttpClient:
+    """Plain HTTP with one keep-alive session, for pages served without JavaScript."""
+
+    def __init__(self, timeout=30, user_agent=USER_AGENT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+
+    def get(self, url):
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(f"{url}: {e}") from e
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get("Retry-After")
+            raise RetryableError(
+                f"{url}: HTTP {response.status_code}", float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        response.raise_for_status()
+        return check_page(url, response.text)
+
+    def close(self):
+        self.session.close()
+
+
+class BrowserClient:
+    """A long-lived headless Chrome, reused for every page instead of one browser per page.
+
+    A page load failing in the browser (timeout, crashed tab) restarts
+    Chrome and is raised as a RetryableError, as is a rate limit page.
+    """
+
+    def __init__(self, path_chrome, settle=(5, 7), user_agent=USER_AGENT, timeout=60):
+        self.path_chrome = path_chrome
+        self.settle = settle
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.driver = self._start()
+
+    def _start(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        options = Options()
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument(f"user-agent={self.user_agent}")
+        driver = webdriver.Chrome(service=Service(str(self.path_chrome)), options=options)
+        driver.set_page_load_timeout(self.timeout)
+        return driver
+
+    def get(self, url):
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            self.driver.get(url)
+            time.sleep(random.uniform(*self.settle))
+            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            page = self.driver.page_source
+        except WebDriverException as e:
+            self.restart()
+            raise RetryableError(f"{url}: {type(e).__name__}: {e.msg}") from e
+        return check_page(url, page)
+
+    def restart(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = self._start()
+
+    def close(self):
+        self.driver.quit()
+
+
+class ClientPool:
+    """At most `size` clients created on demand and handed to one thread at a time.
+
+    A client that failed other than with an answer of the server (a
+    retryable status, a 404) is closed and replaced, so a stuck browser
+    does not serve the next page.
+    """
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.clients = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def client(self):
+        with self.slots:
+            try:
+                client = self.idle.get_nowait()
+            except queue.Empty:
+                client = self.factory()
+                with self.lock:
+                    self.clients.append(client)
+            try:
+                yield client
+            except (RetryableError, requests.HTTPError):
+                self.idle.put(client)
+                raise
+            except BaseException:
+                self._discard(client)
+                raise
+            self.idle.put(client)
+
+    def _discard(self, client):
+        with self.lock:
+            self.clients.remove(client)
+        client.close()
+
+    def close(self):
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.close()
+
+
+# ------------------------- Fetcher -------------------------
+class Fetcher:
+    """Pages fetched through a client pool under a shared token bucket, with retries and exponential backoff.
+
+    With a `cache` (a PageCache) every page fetched is kept under its
+    original URL, to be parsed again later with a ReplayFetcher.
+    """
+
+    def __init__(self, factory=HttpClient, size=2, rate=DEFAULT_RATE, capacity=1,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, base_url=None, cache=None):
+        self.pool = ClientPool(factory, size)
+        self.size = size
+        self.bucket = TokenBucket(rate, capacity)
+        self.retries = retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self.cache = cache
+
+    def __call__(self, url):
+        """A page, through whichever client of the pool is free."""
+        def get(target):
+            with self.pool.client() as client:
+                return client.get(target)
+        return self._fetch(url, get)
+
+    @contextmanager
+    def session(self):
+        """A fetch function holding one client of the pool for a run of pages, e.g. every stat tab of a league.
+
+        Each page still waits for the shared bucket and is retried; a client
+        failing otherwise is replaced when the session ends.
+        """
+        with self.pool.client() as client:
+            yield lambda url: self._fetch(url, client.get)
+
+    def _fetch(self, url, get):
+        target = rebase(url, self.base_url)
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                # Checked again here whatever the client, so a blocked page is never cached as the latest version.
+                page = check_page(target, get(target))
+                if self.cache is not None:
+                    self.cache.put(url, page)
+                return page
+            except RetryableError as e:
+                if attempt == self.retries:
+                    raise
+                delay = min(MAX_BACKOFF, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+                if e.retry_after is not None:
+                    self.bucket.pause(e.retry_after)
+                    delay = max(delay, e.retry_after)
+                time.sleep(delay)
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def rebase(url, base_url):
+    """`url` on another scheme and host, e.g. a stub server serving saved pages."""
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + parts.path, parts.query, parts.fragment))
+
+
+# ------------------------- Engine -------------------------
+def scrape(jobs, fetch, parse, fetch_workers=None, parse_workers=None):
+    """Fetch the (key, url, args) jobs concurrently and parse their pages in a separate process pool.
+
+    `fetch(url)` returns a page, `parse(page, *args)` its result. Yields
+    (key, result, error) in completion order, error being the exception of
+    a failed fetch or parse.
+    """
+    fetch_workers = fetch_workers or getattr(fetch, "size", 1)
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, ProcessPoolExecutor(max_workers=parse_workers) as parsers:
+        fetching = {fetchers.submit(fetch, url): (key, args) for key, url, args in jobs}
+        parsing = {}
+        while fetching or parsing:
+            done, _ = wait([*fetching, *parsing], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    key, args = fetching.pop(future)
+                    if future.exception() is not None:
+                        yield key, None, future.exception()
+                    else:
+                        parsing[parsers.submit(parse, future.result(), *args)] = key
+                else:
+                    key = parsing.pop(future)
+                    error = future.exception()
+                    yield key, None if error else future.result(), error
+
+
+# ------------------------- Schedules -------------------------
+def new_gameweek(gameweek, count):
+    """Game week of a European knockout match, numbered after the league phase."""
+    if gameweek == 'Knockout phase play-offs' and count <= 8:
+        gameweek = 'J9'
+        count += 1
+    elif gameweek == 'Knockout phase play-offs' and count <= 16:
+        gameweek = 'J10'
+        count += 1
+    elif gameweek == 'Round of 16' and count <= 24:
+        gameweek = 'J11'
+        count += 1
+    elif gameweek == 'Round of 16' and count <= 32:
+        gameweek = 'J12'
+        count += 1
+    elif gameweek == 'Quarter-finals' and count <= 36:
+        gameweek = 'J13'
+        count += 1
+    elif gameweek == 'Quarter-finals' and count <= 40:
+        gameweek = 'J14'
+        count += 1
+    elif gameweek == 'Semi-finals' and count <= 42:
+        gameweek = 'J15'
+        count += 1
+    elif gameweek == 'Semi-finals' and count <= 44:
+        gameweek = 'J16'
+        count += 1
+    if gameweek == 'Final':
+        gameweek = 'J17'
+        count += 1
+    return gameweek, count
+
+def parse_schedule(html, table_id):
+    """Games of a league's "Scores & Fixtures" page; table_id "sched_all" for the European cups."""
+    from bs4 import BeautifulSoup
+
+    table = BeautifulSoup(html, "html.parser").find("table", id=table_id)
+    games = []
+    count = 1
+    for row in table.find_all("tr"):
+        if table_id != "sched_all":
+            game_week = row.find("th", {"data-stat": "gameweek"})
+            gameweek = "J" + game_week.text.strip() if game_week else None
+            home = row.find("td", {"data-stat": "home_team"})
+            away = row.find("td", {"data-stat": "away_team"})
+            if not home or not away:
+                continue
+            if not home.text.strip() or not away.text.strip():
+                continue
+            home = home.text.strip()
+            away = away.text.strip()
+        else:
+            week = row.find("th", {"data-stat": "round"})
+            if week.text.strip() == "League phase":
+                gameweek = "J" + row.find("td", {"data-stat": "gameweek"}).text.strip()
+            else:
+                gameweek = week.text.strip()
+            # Cup teams come with their country code, "Lille fr" at home and "es Real Madrid" away.
+            home = row.find("td", {"data-stat": "home_team"})
+            if home:
+                words = home.text.strip().split()
+                home = " ".join(words[:-1]) if len(words) > 1 else home.text.strip()
+            away = row.find("td", {"data-stat": "away_team"})
+            if away:
+                words = away.text.strip().split()
+                away = " ".join(words[1:]) if len(words) > 1 else away.text.strip()
+            gameweek, count = new_gameweek(gameweek, count)
+            if not home or not away:
+                continue
+
+        cells = {stat: row.find("td", {"data-stat": stat}) for stat in ("score", "attendance", "venue", "referee", "date")}
+        link = None
+        report = row.find("td", {"data-stat": "match_report"})
+        if report:
+            a = report.find("a")
+            if a and a.has_attr("href"):
+                link = "https://fbref.com" + a["href"]
+
+        games.append({
+            "Game Week": gameweek,
+            "Home Team": home,
+            "Away Team": away,
+            **{stat.capitalize(): cell.text.strip() if cell else None for stat, cell in cells.items()},
+            "URL": link,
+        })
+    return games
+
+
+# ------------------------- Tables -------------------------
+_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+def _cell_text(cell):
+    return _WHITESPACE.sub(" ", cell.text_content().strip())
+
+def _row_texts(row):
+    texts = []
+    for cell in row.xpath("./td|./th"):
+        texts.extend([_cell_text(cell)] * int(cell.get("colspan") or 1))
+    return texts
+
+def table_rows(table):
+    """Header, body and footer text rows of an lxml table, as pd.read_html splits and reads them.
+
+    Short rows are padded with empty cells to the table's widest row.
+    """
+    head = table.xpath(".//thead/tr")
+    body = table.xpath(".//tbody//tr") + table.xpath("./tr")
+    foot = table.xpath(".//tfoot//tr")
+    if not head:
+        while body and all(cell.tag == "th" for cell in body[0].xpath("./td|./th")):
+            head.append(body.pop(0))
+    sections = [[_row_texts(row) for row in rows] for rows in (head, body, foot)]
+    width = max((len(row) for rows in sections for row in rows), default=0)
+    return tuple([row + [""] * (width - len(row)) for row in rows] for rows in sections)
+
+def read_rows(rows, header):
+    """Frame of text rows typed as pd.read_html types a table: numbers, "1,234", NaN for empty cells."""
+    with TextParser(rows, header=header, thousands=",") as parser:
+        return parser.read()
+
+def read_table(table):
+    """An lxml table as pd.read_html reads it, header rows included."""
+    head, body, foot = table_rows(table)
+    header = None
+    if head:
+        header = 0 if len(head) == 1 else [i for i, row in enumerate(head) if any(row)]
+    return read_rows(head + body + foot, header)
+
+def side_by_side(tables):
+    """Rows of tables about the same players joined into one wide row each (the tables' own order).
+
+    The top header row is prefixed with the table's position, so a column
+    name repeated in several tables is not renamed "Att.1" when parsed.
+    """
+    sections = [table_rows(table) for table in tables]
+    for i, name in enumerate(["header", "body", "footer"]):
+        counts = {len(section[i]) for section in sections}
+        if len(counts) > 1:
+            raise ValueError(f"tables {[table.get('id') for table in tables]} have {sorted(counts)} {name} rows")
+    for position, (head, _, _) in enumerate(sections):
+        if len(head) > 1:
+            head[0] = [f"{position}/{text}" for text in head[0]]
+    return tuple([sum(rows, []) for rows in zip(*(section[i] for section in sections))] for i in range(3))
+
+
+# ------------------------- Match pages -------------------------
+MATCH_STATS = ["summary", "passing", "passing_types", "defense", "possession", "misc"]
+
+def match_tables(doc):
+    """Player stats tables of both teams (home first), their keeper tables and the team stats table, by fbref id.
+
+    Raises ValueError naming what is missing, so a page fbref changed fails
+    loudly instead of picking the wrong tables.
+    """
+    by_id = {table.get("id"): table for table in doc.iter("table") if table.get("id")}
+    teams = [table_id[len("stats_"):-len("_summary")] for table_id in by_id
+             if table_id.startswith("stats_") and table_id.endswith("_summary")]
+    if len(teams) != 2:
+        raise ValueError(f"match report with {len(teams)} summary tables instead of 2")
+    ids = {team: [f"stats_{team}_{stat}" for stat in MATCH_STATS] + [f"keeper_stats_{team}"] for team in teams}
+    tables = {table_id: by_id.get(table_id) for team_ids in ids.values() for table_id in team_ids}
+    team_stats = doc.xpath('//div[@id="team_stats"]//table')
+    missing = [table_id for table_id, table in tables.items() if table is None] + ([] if team_stats else ["team_stats"])
+    if missing:
+        raise ValueError(f"match report without {missing}")
+    players = [[tables[table_id] for table_id in ids[team][:-1]] for team in teams]
+    keepers = [tables[ids[team][-1]] for team in teams]
+    return players, keepers, team_stats[0]
+
+def _match_frame(sides, teams, game_week, league, footers):
+    """Both teams' rows parsed at once, with the match columns of the raw files; footer rows dropped unless `footers`."""
+    header = sides[0][0]
+    rows, kept = list(header), []
+    for (_, body, foot), team in zip(sides, teams):
+        kept += [team] * len(body) + ([team] * len(foot) if footers else [None] * len(foot))
+        rows += body + foot
+    df = read_rows(rows, header=list(range(len(header))))
+    df = df[[team is not None for team in kept]].reset_index(drop=True)
+    df.columns = df.columns.get_level_values(-1)
+    match = pd.DataFrame({"Game Week": game_week, "Team": [team for team in kept if team is not None], "League": league})
+    return pd.concat([match[["Game Week"]], df.iloc[:, :1], match[["Team", "League"]], df.iloc[:, 1:]], axis=1)
+
+def match_team_stats(table, home_team, away_team, game_week, league):
+    """Possession, passing accuracy... of both teams from the match's team stats table."""
+    stats, home_values, away_values = [], [], []
+    current_stat = "Possession"
+    for i in range(len(table)):
+        b = table.iloc[i, 0]
+        l = table.iloc[i, 1]
+        if (b is not None and ('%' not in str(b) and '—' not in str(b))) or \
+                (l is not None and ('%' not in str(l) and '—' not in str(l))):
+            current_stat = b if b is not None else l
+        else:
+            stats.append(current_stat)
+            home_values.append(b)
+            away_values.append(l)
+
+    df_clean = pd.DataFrame({home_team: home_values, away_team: away_values}, index=stats).T
+    df_clean.insert(0, 'Game Week', [game_week] * len(df_clean))
+    df_clean.insert(0, 'League', [league] * len(df_clean))
+    df_clean.index.name = 'Team'
+    return df_clean
+
+def parse_match(html, game_week, home_team, away_team, league):
+    """Players, goalkeepers and team stats of a match report page.
+
+    Only the tables used are read, from one lxml parse of the page. The
+    team totals closing the player tables are dropped.
+    """
+    import lxml.html
+
+    players, keepers, team_table = match_tables(lxml.html.fromstring(html))
+    teams = [home_team, away_team]
+    data_players = _match_frame([side_by_side(tables) for tables in players], teams, game_week, league, footers=False)
+    data_goals = _match_frame([table_rows(table) for table in keepers], teams, game_week, league, footers=True)
+
+    data_teams = match_team_stats(read_table(team_table), home_team, away_team, game_week, league)
+    return data_players, data_goals, data_teams
+
+
+# ------------------------- Stats pages -------------------------
+def first_table(html):
+    """First table of a competition stats page, None when the page has none."""
+    from bs4 import BeautifulSoup
+
+    tables = BeautifulSoup(html, "html.parser").find_all("table")
+    if not tables:
+        return None
+    return pd.read_html(StringIO(str(tables)))[0]
+
+def _table_by_id(root, table_id):
+    return next((table for table in root.iter("table") if table.get("id") == table_id), None)
+
+def stats_table(html, table_id):
+    """Table `table_id` of a competition stats page, read as pd.read_html reads it.
+
+    fbref ships every table but the squad one inside an HTML comment, put in
+    place by JavaScript; such a table is read from its comment. Raises
+    ValueError when the page has no such table.
+    """
+    import lxml.html
+    from lxml import etree
+
+    doc = lxml.html.fromstring(html)
+    table = _table_by_id(doc, table_id)
+    if table is None:
+        for comment in doc.iter(etree.Comment):
+            if comment.text and f'id="{table_id}"' in comment.text:
+                table = _table_by_id(lxml.html.fromstring(comment.text), table_id)
+                break
+    if table is None:
+        raise ValueError(f"no table {table_id}")
+    return read_table(table)
+
+def stats_url(league_infos, stat):
+    """Stat tab of a league, from its [name, fbref id, url name] infos."""
+    return f"https://fbref.com/en/comps/{league_infos[1]}/{stat}/{league_infos[2]}-Stats"
+
+def league_tables(fetcher, league_infos, tabs):
+    """Every stat tab of a league fetched in one session of `fetcher`, each group of tabs joined side by side.
+
+    `tabs` maps a group name to its (stat, table id) pairs, e.g. the outfield
+    and goalkeeper tabs.
+    """
+    # Parsed once the session is over: a page without its table is not the
+    # client's fault, and must not get the browser discarded by the pool.
+    with fetcher.session() as fetch:
+        pages = {stat: fetch(stats_url(league_infos, stat)) for pairs in tabs.values() for stat, _ in pairs}
+    return {
+        name: pd.concat([stats_table(pages[stat], table_id).drop_duplicates() for stat, table_id in pairs], axis=1)
+        for name, pairs in tabs.items()
+    }
+
+def scrape_leagues(leagues_infos, fetcher, tabs, workers=None):
+    """league_tables of every league, fetched in parallel under the fetcher's rate limit.
+
+    Yields (league name, tables, error) as the leagues complete.
+    """
+    with ThreadPoolExecutor(max_workers=workers or fetcher.size) as pool:
+        futures = {pool.submit(league_tables, fetcher, league_infos, tabs): league_infos[0] for league_infos in leagues_infos}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+
+# ------------------------- Manifest -------------------------
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def files_checksum(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ScrapeManifest:
+    """Outcome of every match scraped into a raw folder, keyed by match URL.
+
+    One line per attempt (status "ok" or "failed", checksum of the raw
+    files written, time, consecutive failures, error), the latest line of
+    a URL being its state. Appended as the matches complete, so an
+    interrupted run keeps what it did.
+    """
+
+    def __init__(self, raw_folder):
+        self.path = os.path.join(str(raw_folder), MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["url"]] = entry
+
+    def record(self, url, number, status, checksum=None, error=None):
+        previous = self.entries.get(url, {})
+        entry = {
+            "url": url,
+            "number": number,
+            "status": status,
+            "checksum": checksum,
+            "last_attempt": _now(),
+            "failures": previous.get("failures", 0) + 1 if status == "failed" else 0,
+            "error": error,
+        }
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries[url] = entry
+        return entry
+
+    def due(self, url, now=None):
+        """Whether `url` is to be scraped: never attempted, or failed long enough ago."""
+        entry = self.entries.get(url)
+        if entry is None:
+            return True
+        if entry["status"] == "ok":
+            return False
+        wait = min(MAX_RETRY_AFTER, RETRY_AFTER * 2 ** (entry["failures"] - 1))
+        now = now or datetime.now(timezone.utc)
+        return now >= datetime.fromisoformat(entry["last_attempt"]) + wait
+
+    def __contains__(self, url):
+        return url in self.entries
+
+
+# ------------------------- Matches -------------------------
+def raw_paths(raw_folder, number):
+    return {name: os.path.join(raw_folder, f"{name}_{number}.csv") for name in RAW_FILES}
+
+def match_jobs(season, raw_folder, leagues=MATCH_LEAGUES, missing_only=True):
+    """(number, url, parse args) of the played matches of the season's schedules still to scrape.
+
+    Matches are numbered across every schedule in MATCH_LEAGUES order,
+    unplayed ones included, as the raw files are. A match is to scrape when
+    the raw folder's manifest has no record of it or its last attempt
+    failed and is due for a retry; one with raw files but no record (a
+    folder scraped before the manifest) is recorded as done. With
+    `missing_only` False every played match is listed, to parse the
+    season again from the page cache.
+    """
+    manifest = ScrapeManifest(raw_folder)
+    jobs = []
+    number = 1
+    for league in MATCH_LEAGUES:
+        games = pd.read_csv(season_path(season, "Leagues Games", f"{league}_games.csv"), header=0, index_col=False)
+        for game in games.to_dict(orient="records"):
+            played = not (pd.isna(game["Score"]) or game["Score"] in ("", None))
+            if played and league in leagues:
+                url = game["URL"]
+                if url not in manifest:
+                    paths = list(raw_paths(raw_folder, number).values())
+                    if all(os.path.exists(p) for p in paths):
+                        manifest.record(url, number, "ok", files_checksum(paths))
+                if not missing_only or manifest.due(url):
+                    jobs.append((number, url, (game["Game Week"], game["Home Team"], game["Away Team"], league)))
+            number += 1
+    return jobs
+
+def write_match(raw_folder, number, tables):
+    data_players, data_goals, data_teams = tables
+    paths = raw_paths(raw_folder, number)
+    data_players.to_csv(paths["data_players"], index=False)
+    data_goals.to_csv(paths["data_goals"], index=False)
+    data_teams.to_csv(paths["data_teams"], index=True)
+    return files_checksum(paths.values())
+
+def scrape_matches(jobs, raw_folder, fetcher, parse_workers=None, record=True):
+    """Fetch, parse and save every match job, recording each outcome in the raw folder's manifest.
+
+    The failed ones are reported and left missing, to be retried by a later run.
+    With `record` False (a replay from the page cache) the manifest is left
+    as it is, so a page missing from the cache never marks a scraped match
+    as failed.
+    """
+    os.makedirs(raw_folder, exist_ok=True)
+    manifest = ScrapeManifest(raw_folder)
+    urls = {number: url for number, url, _ in jobs}
+    failed = []
+    for number, tables, error in scrape(jobs, fetcher, parse_match, parse_workers=parse_workers):
+        if error is not None:
+            print(f"Failed for {number}: {error}")
+            if record:
+                manifest.record(urls[number], number, "failed", error=f"{type(error).__name__}: {error}")
+            failed.append(number)
+        else:
+            checksum = write_match(raw_folder, number, tables)
+            if record:
+                manifest.record(urls[number], number, "ok", checksum)
+            print(f"{number} saved")
+    return failed
+
+
+# ------------------------- Stub server -------------------------
+class StubHandler(BaseHTTPRequestHandler):
+    """Saved pages of `folder` by URL path (path.html first), failing the first requests of a path when asked."""
+
+    folder = "."
+    failures = {}
+    delay = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        path = urlsplit(self.path).path
+        with self.lock:
+            failing = self.failures.get(path, 0)
+            if failing:
+                self.failures[path] = failing - 1
+        if failing:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+            return
+        for candidate in (path + ".html", path):
+            file = os.path.join(self.folder, candidate.lstrip("/"))
+            if os.path.isfile(file):
+                with open(file, "rb") as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+        self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_stub(folder, port=0, failures=None, delay=0):
+    """Serve saved pages from a background thread; returns the server and its base URL."""
+    handler = type("Handler", (StubHandler,), {"folder": folder, "failures": dict(failures or {}), "delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ------------------------- CLI -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the raw tables of the played matches not yet in a raw data folder's manifest.")
+    parser.add_argument("raw_folder", help="folder of the data_players_<n>.csv, data_goals_<n>.csv and data_teams_<n>.csv files")
+    parser.add_argument("--season", default=list(SEASONS)[0], choices=list(SEASONS))
+    parser.add_argument("--league", action="append", choices=MATCH_LEAGUES, help="default: every league")
+    parser.add_argument("--chrome", help="chromedriver path: fetch with headless Chrome instead of plain HTTP")
+    parser.add_argument("--sessions", type=int, default=2, help="concurrent HTTP sessions or browsers")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="requests per second, default 10 a minute")
+    parser.add_argument("--parse-workers", type=int, default=None, help="parsing processes, default: one per core")
+    parser.add_argument("--base-url", help="fetch from this host instead, e.g. a stub server")
+    parser.add_argument("--cache", help="page cache folder: keep every page fetched")
+    parser.add_argument("--replay", action="store_true", help="parse every played match again from --cache, without network")
+    parser.add_argument("--stub", metavar="FOLDER", help="only serve the saved pages of FOLDER on --port")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.stub:
+        server, base_url = serve_stub(args.stub, args.port)
+        print(f"Serving {args.stub} on {base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    if args.replay and not args.cache:
+        parser.error("--replay needs --cache")
+    cache = PageCache(args.cache) if args.cache else None
+    factory = (lambda: BrowserClient(args.chrome)) if args.chrome else HttpClient
+    jobs = match_jobs(args.season, args.raw_folder, args.league or MATCH_LEAGUES, missing_only=not args.replay)
+    if args.replay:
+        jobs = [job for job in jobs if job[1] in cache]
+    print(f"{len(jobs)} matches to {'parse' if args.replay else 'scrape'}")
+    if args.replay:
+        fetcher = ReplayFetcher(cache)
+    else:
+        fetcher = Fetcher(factory, args.sessions, args.rate, base_url=args.base_url, cache=cache)
+    with fetcher:
+        failed = scrape_matches(jobs, args.raw_folder, fetcher, args.parse_workers, record=not args.replay)
+    print(f"{len(jobs) - len(failed)} matches saved, {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
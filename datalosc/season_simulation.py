@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from datalosc.simulation import incidence, parse_scores
+
+DOMESTIC_LEAGUES = {
+    "Italian Serie A": {"europe": 6, "relegation": 3},
+    "French Ligue 1": {"europe": 6, "relegation": 2},
+    "German Bundesliga": {"europe": 6, "relegation": 2},
+    "English Premier League": {"europe": 6, "relegation": 3},
+    "Spanish La Liga": {"europe": 7, "relegation": 3},
+}
+# League averages used before the first matchday, and the number of
+# league-average matches every team starts with so early rates stay sane.
+HOME_GOALS = 1.5
+AWAY_GOALS = 1.2
+PRIOR_MATCHES = 5
+MAX_GOALS = 15
+BATCH_SIZE = 10_000
+
+
+# ------------------------- Model -------------------------
+def split_matches(matches, matches_played, per_round):
+    """Played matches (with a readable score) up to the matchday, and every other match."""
+    home_goals, away_goals = parse_scores(matches["Score"].fillna(""))
+    played = (np.arange(len(matches)) < matches_played * per_round) & home_goals.notna().to_numpy()
+    played_matches = matches[played].assign(home_goals=home_goals[played], away_goals=away_goals[played])
+    return played_matches, matches[~played]
+
+def goal_rates(played, teams):
+    """Expected home and away goals factors: league means, attack and defence strength per team."""
+    if played.empty:
+        home_mean, away_mean = HOME_GOALS, AWAY_GOALS
+    else:
+        home_mean, away_mean = played["home_goals"].mean(), played["away_goals"].mean()
+    average = (home_mean + away_mean) / 2
+
+    scored = pd.concat([
+        played.groupby("Home Team")["home_goals"].sum(), played.groupby("Away Team")["away_goals"].sum()
+    ]).groupby(level=0).sum().reindex(teams, fill_value=0)
+    conceded = pd.concat([
+        played.groupby("Home Team")["away_goals"].sum(), played.groupby("Away Team")["home_goals"].sum()
+    ]).groupby(level=0).sum().reindex(teams, fill_value=0)
+    games = pd.concat([played["Home Team"], played["Away Team"]]).value_counts().reindex(teams, fill_value=0)
+
+    attack = (scored + PRIOR_MATCHES * average) / (games + PRIOR_MATCHES) / average
+    defence = (conceded + PRIOR_MATCHES * average) / (games + PRIOR_MATCHES) / average
+    return home_mean, away_mean, attack.to_numpy(), defence.to_numpy()
+
+
+# ------------------------- Simulation -------------------------
+def poisson_cdf(rates):
+    """Cumulative probabilities of 0..MAX_GOALS - 1 goals, shape (MAX_GOALS, matches)."""
+    goals = np.arange(MAX_GOALS)
+    log_factorials = np.concatenate([[0], np.cumsum(np.log(np.arange(1, MAX_GOALS)))])
+    pmf = np.exp(goals[:, None] * np.log(rates) - rates - log_factorials[:, None])
+    return np.cumsum(pmf, axis=0).astype(np.float32)
+
+def sample_goals(cdf, size, rng):
+    # Inverse transform on float32 uniforms, counting the thresholds each draw
+    # passes, is several times faster than rng.poisson on a (size, matches) array.
+    draws = rng.random((size, cdf.shape[1]), dtype=np.float32)
+    goals = np.zeros(draws.shape, dtype=np.uint8)
+    passed = np.empty(draws.shape, dtype=bool)
+    for threshold in cdf:
+        np.greater_equal(draws, threshold, out=passed)
+        goals += passed
+    return goals.astype(np.float32)
+
+def rank_table(points, goal_diff, goals):
+    """1-based positions per simulation with the points, goal difference, goals scored tie-breakers."""
+    order = np.lexsort((-goals, -goal_diff, -points), axis=-1)
+    positions = np.empty_like(order)
+    ranks = np.broadcast_to(np.arange(1, points.shape[1] + 1), points.shape)
+    np.put_along_axis(positions, order, ranks, axis=1)
+    return positions
+
+def simulate_season(standing, remaining, lambda_home, lambda_away, n, rng=None, batch_size=BATCH_SIZE):
+    """Count the final positions of every team over n simulated ends of season.
+
+    `standing` gives the current Pts, Goals and Goals Against per team and
+    `remaining` the home and away team indices of the matches left.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    teams = len(standing)
+    home, away = remaining
+    home_matrix, away_matrix = incidence(home, teams), incidence(away, teams)
+    home_cdf, away_cdf = poisson_cdf(lambda_home), poisson_cdf(lambda_away)
+    result = {
+        "n": 0,
+        "position_counts": np.zeros((teams, teams), dtype=np.int64),
+        "points_sum": np.zeros(teams, dtype=np.int64),
+    }
+
+    for start in range(0, n, batch_size):
+        size = min(batch_size, n - start)
+        home_goals = sample_goals(home_cdf, size, rng)
+        away_goals = sample_goals(away_cdf, size, rng)
+        home_points = 3 * (home_goals > away_goals) + (home_goals == away_goals).astype(np.float32)
+        away_points = 3 * (away_goals > home_goals) + (home_goals == away_goals).astype(np.float32)
+
+        points = standing["Pts"].to_numpy() + home_points @ home_matrix + away_points @ away_matrix
+        goals = standing["Goals"].to_numpy() + home_goals @ home_matrix + away_goals @ away_matrix
+        against = standing["Goals Against"].to_numpy() + away_goals @ home_matrix + home_goals @ away_matrix
+        positions = rank_table(points, goals - against, goals)
+
+        cells = np.arange(teams) * teams + positions - 1
+        result["position_counts"] += np.bincount(cells.ravel(), minlength=teams * teams).reshape(teams, teams)
+        result["points_sum"] += points.sum(axis=0).astype(np.int64)
+        result["n"] += size
+    return result
+
+def simulate_rest_of_season(matches, standing, matches_played, per_round, n, seed=None):
+    teams = standing["Team"].tolist()
+    index = {team: i for i, team in enumerate(teams)}
+    played, remaining = split_matches(matches, matches_played, per_round)
+    home = remaining["Home Team"].map(index).to_numpy(dtype=np.int64)
+    away = remaining["Away Team"].map(index).to_numpy(dtype=np.int64)
+
+    home_mean, away_mean, attack, defence = goal_rates(played, teams)
+    lambda_home = home_mean * attack[home] * defence[away]
+    lambda_away = away_mean * attack[away] * defence[home]
+    return simulate_season(standing, (home, away), lambda_home, lambda_away, n, np.random.default_rng(seed))
+
+
+# ------------------------- Summaries -------------------------
+def season_probabilities(result, teams, europe, relegation):
+    counts = result["position_counts"]
+    n = result["n"]
+    positions = np.arange(1, counts.shape[1] + 1)
+    return pd.DataFrame({
+        "Title %": 100 * counts[:, 0] / n,
+        "Top 4 %": 100 * counts[:, :4].sum(axis=1) / n,
+        "Europe %": 100 * counts[:, :europe].sum(axis=1) / n,
+        "Relegation %": 100 * counts[:, counts.shape[1] - relegation:].sum(axis=1) / n,
+        "Expected Position": counts @ positions / n,
+        "Expected Points": result["points_sum"] / n,
+    }, index=list(teams))
@@ -0,0 +1,256 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+OUTCOMES = ["Qualifications", "Playoffs", "Eliminations"]
+ROUNDS = ["Play-offs", "Round of 16", "Quarter-finals", "Semi-finals", "Final", "Winner"]
+LEAGUE_PHASE_MATCHES = {
+    "UEFA Champions League": 8,
+    "UEFA Europa League": 8,
+    "UEFA Europa Conference League": 6,
+}
+QUALIFIED = 8
+PLAYOFFS = 24
+BATCH_SIZE = 25_000
+CHUNK_SIZE = 25_000
+
+
+# ------------------------- Fixtures -------------------------
+def parse_scores(scores):
+    """Home and away goals of "2–1" scores, NaN when the score can't be read."""
+    goals = scores.str.replace("–", "-").str.extract(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+    return goals[0].astype(float), goals[1].astype(float)
+
+def compute_standing(matches, matches_played, per_round=18):
+    played = matches[:matches_played * per_round].dropna(subset=["Score"])
+    teams = sorted(set(matches["Home Team"]).union(set(matches["Away Team"])))
+    home_goals, away_goals = parse_scores(played["Score"])
+    played = played.assign(home_goals=home_goals, away_goals=away_goals).dropna(subset=["home_goals", "away_goals"])
+
+    home = played.assign(
+        Team=played["Home Team"], Goals=played["home_goals"], Against=played["away_goals"]
+    )
+    away = played.assign(
+        Team=played["Away Team"], Goals=played["away_goals"], Against=played["home_goals"]
+    )
+    rows = pd.concat([home, away])[["Team", "Goals", "Against"]]
+    rows["Pts"] = np.select([rows["Goals"] > rows["Against"], rows["Goals"] == rows["Against"]], [3, 1], 0)
+    totals = rows.groupby("Team")[["Pts", "Goals", "Against"]].sum().reindex(teams, fill_value=0).astype(int)
+
+    df_points = pd.DataFrame({
+        "Team": teams,
+        "Pts": totals["Pts"].to_numpy(),
+        "Goals": totals["Goals"].to_numpy(),
+        "Goals Against": totals["Against"].to_numpy(),
+    })
+    df_points["Goal Diff"] = df_points["Goals"] - df_points["Goals Against"]
+    return df_points
+
+def remaining_fixtures(matches, teams, matches_played, per_round=18):
+    index = {team: i for i, team in enumerate(teams)}
+    remaining = matches[matches_played * per_round:]
+    home = remaining["Home Team"].map(index).to_numpy(dtype=np.int64)
+    away = remaining["Away Team"].map(index).to_numpy(dtype=np.int64)
+    return home, away
+
+def incidence(fixtures, n_teams):
+    matrix = np.zeros((len(fixtures), n_teams), dtype=np.float32)
+    matrix[np.arange(len(fixtures)), fixtures] = 1
+    return matrix
+
+def match_thresholds(home, away, coefficients, proba_draw):
+    # Same model as the original rd.choices draw: a uniform number below
+    # the first threshold is a home win, below the second one a draw.
+    coeff_home = coefficients[home]
+    coeff_away = coefficients[away]
+    proba_home = coeff_home * (1 - proba_draw) / (coeff_home + coeff_away)
+    return proba_home.astype(np.float32), (proba_home + proba_draw).astype(np.float32)
+
+
+# ------------------------- Simulation -------------------------
+def simulate_points(base_points, home, away, thresholds, n, rng):
+    """Final points of every team, shape (n, teams), for n simulated league phases."""
+    points = np.broadcast_to(base_points.astype(np.float32), (n, len(base_points))).copy()
+    if len(home) == 0:
+        return points.astype(np.int16)
+
+    draws = rng.random((n, len(home)), dtype=np.float32)
+    home_win = draws < thresholds[0]
+    draw = ~home_win & (draws < thresholds[1])
+    away_win = ~home_win & ~draw
+
+    home_points = 3 * home_win.astype(np.float32) + draw
+    away_points = 3 * away_win.astype(np.float32) + draw
+    points += home_points @ incidence(home, len(base_points))
+    points += away_points @ incidence(away, len(base_points))
+    return points.astype(np.int16)
+
+def ranking_order(points):
+    """Team indices from first to last per simulation, ties broken by team order like a stable sort."""
+    return np.argsort(-points, axis=1, kind="stable")
+
+def rank_positions(points, order=None):
+    """1-based positions per simulation."""
+    order = ranking_order(points) if order is None else order
+    positions = np.empty_like(order)
+    ranks = np.broadcast_to(np.arange(1, points.shape[1] + 1), points.shape)
+    np.put_along_axis(positions, order, ranks, axis=1)
+    return positions
+
+def empty_result(n_teams, max_points):
+    return {
+        "n": 0,
+        "outcomes": np.zeros((n_teams, len(OUTCOMES)), dtype=np.int64),
+        "points_by_outcome": np.zeros((len(OUTCOMES), max_points + 1), dtype=np.int64),
+        "points_sum": np.zeros(n_teams, dtype=np.int64),
+        "rounds": np.zeros((n_teams, len(ROUNDS)), dtype=np.int64),
+    }
+
+def accumulate(result, points, positions):
+    outcome = np.searchsorted([QUALIFIED, PLAYOFFS], positions, side="left")
+    max_points = result["points_by_outcome"].shape[1] - 1
+    for i in range(len(OUTCOMES)):
+        mask = outcome == i
+        result["outcomes"][:, i] += mask.sum(axis=0)
+        result["points_by_outcome"][i] += np.bincount(points[mask], minlength=max_points + 1)[:max_points + 1]
+    result["points_sum"] += points.sum(axis=0, dtype=np.int64)
+    result["n"] += len(points)
+    return result
+
+def play_ties(first, second, coefficients, rng):
+    coeff_first = coefficients[first]
+    coeff_second = coefficients[second]
+    return np.where(rng.random(first.shape) < coeff_first / (coeff_first + coeff_second), first, second)
+
+def draw_ties(seeded, unseeded, rng):
+    """Pair two seeded teams with two unseeded ones at random, in every simulation at once."""
+    swap = rng.random(len(seeded)) < 0.5
+    return seeded, np.where(swap[:, None], unseeded[:, ::-1], unseeded)
+
+def simulate_knockout(order, coefficients, rng):
+    """Teams reaching each of ROUNDS, from the league-phase ranking of every simulation.
+
+    Play-offs: 9/10 v 23/24, 11/12 v 21/22, 13/14 v 19/20, 15/16 v 17/18.
+    Round of 16: 1/2, 3/4, 5/6, 7/8 against the winners of the 15/16, 13/14,
+    11/12, 9/10 play-offs, then a fixed bracket keeping 1 and 2 apart.
+    """
+    playoff_winners = []
+    for pair in range(4):
+        seeded, unseeded = draw_ties(order[:, 8 + 2*pair:10 + 2*pair], order[:, 22 - 2*pair:24 - 2*pair], rng)
+        playoff_winners.append(play_ties(seeded, unseeded, coefficients, rng))
+
+    # Round of 16 ties of the 1/2, 3/4, 5/6 and 7/8 seeds, each with two ties.
+    ties = [
+        draw_ties(order[:, 2*pair:2 + 2*pair], playoff_winners[3 - pair], rng)
+        for pair in range(4)
+    ]
+    bracket = [(0, 0), (3, 0), (2, 0), (1, 0), (1, 1), (2, 1), (3, 1), (0, 1)]
+    first = np.stack([ties[pair][0][:, side] for pair, side in bracket], axis=1)
+    second = np.stack([ties[pair][1][:, side] for pair, side in bracket], axis=1)
+
+    reached = [order[:, 8:24], np.concatenate([order[:, :8]] + playoff_winners, axis=1)]
+    winners = play_ties(first, second, coefficients, rng)
+    while winners.shape[1] > 1:
+        reached.append(winners)
+        winners = play_ties(winners[:, 0::2], winners[:, 1::2], coefficients, rng)
+    reached.append(winners)
+    return reached
+
+def simulate_league_phase(base_points, home, away, coefficients, proba_draw, n, max_points, rng=None, batch_size=BATCH_SIZE):
+    rng = np.random.default_rng() if rng is None else rng
+    thresholds = match_thresholds(home, away, coefficients, proba_draw)
+    result = empty_result(len(base_points), max_points)
+    for start in range(0, n, batch_size):
+        points = simulate_points(base_points, home, away, thresholds, min(batch_size, n - start), rng)
+        order = ranking_order(points)
+        accumulate(result, points, rank_positions(points, order))
+        for i, teams in enumerate(simulate_knockout(order, coefficients, rng)):
+            result["rounds"][:, i] += np.bincount(teams.ravel(), minlength=len(base_points))
+    return result
+
+def merge_results(results, n_teams, max_points):
+    merged = empty_result(n_teams, max_points)
+    for result in results:
+        for key in merged:
+            merged[key] += result[key]
+    return merged
+
+def _simulate_chunk(task):
+    base_points, home, away, coefficients, proba_draw, n, max_points, seed = task
+    rng = np.random.default_rng(seed)
+    return simulate_league_phase(base_points, home, away, coefficients, proba_draw, n, max_points, rng, batch_size=n)
+
+def chunk_tasks(base_points, home, away, coefficients, proba_draw, n, max_points, seed_sequence, chunk_size=CHUNK_SIZE):
+    sizes = [min(chunk_size, n - start) for start in range(0, n, chunk_size)]
+    return [
+        (base_points, home, away, coefficients, proba_draw, size, max_points, child)
+        for size, child in zip(sizes, seed_sequence.spawn(len(sizes)))
+    ]
+
+def run_tasks(tasks, workers=1):
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_simulate_chunk, tasks))
+    return [_simulate_chunk(task) for task in tasks]
+
+def run_simulations(base_points, home, away, coefficients, proba_draw, n, max_points, seed=None, workers=1, chunk_size=CHUNK_SIZE):
+    """Run n simulations split in fixed-size chunks, each with its own child RNG stream.
+
+    The chunks and their streams only depend on `seed` and `chunk_size`, and
+    the merged counters are integer sums, so a given seed gives bit-identical
+    results whatever the number of workers.
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    tasks = chunk_tasks(base_points, home, away, coefficients, proba_draw, n, max_points, seed_sequence, chunk_size)
+    result = merge_results(run_tasks(tasks, workers), len(base_points), max_points)
+    result["seed"] = seed_sequence.entropy
+    return result
+
+def standard_errors(result):
+    """Standard error of each team's outcome percentages, in percentage points."""
+    p = result["outcomes"] / result["n"]
+    return 100 * np.sqrt(p * (1 - p) / result["n"])
+
+def run_adaptive(base_points, home, away, coefficients, proba_draw, max_points, tolerance, time_budget, seed=None, workers=1, chunk_size=CHUNK_SIZE, max_simulations=10**7):
+    """Simulate one round of chunks at a time until the largest standard error
+    of the outcome percentages is below `tolerance` (in %), `time_budget`
+    seconds have passed or `max_simulations` have been run.
+
+    Child streams keep being spawned from the same SeedSequence, so a run
+    stopped after k chunks matches run_simulations on k * chunk_size.
+    """
+    start = time.monotonic()
+    seed_sequence = np.random.SeedSequence(seed)
+    result = empty_result(len(base_points), max_points)
+    rounds = max(workers, 1)
+    while result["n"] < max_simulations:
+        n = min(rounds * chunk_size, max_simulations - result["n"])
+        tasks = chunk_tasks(base_points, home, away, coefficients, proba_draw, n, max_points, seed_sequence, chunk_size)
+        result = merge_results([result] + run_tasks(tasks, workers), len(base_points), max_points)
+        if standard_errors(result).max() < tolerance or time.monotonic() - start > time_budget:
+            break
+    result["seed"] = seed_sequence.entropy
+    return result
+
+
+# ------------------------- Summaries -------------------------
+def probability_by_points(result):
+    counts = result["points_by_outcome"]
+    total = counts.sum(axis=0)
+    points = np.flatnonzero(total)
+    percentages = 100 * counts[:, points] / total[points]
+    return points.tolist(), percentages[0].tolist(), percentages[1].tolist(), percentages[2].tolist()
+
+def expected_points(result, teams):
+    return pd.Series(result["points_sum"] / result["n"], index=list(teams))
+
+def outcome_percentages(result, teams):
+    return pd.DataFrame(100 * result["outcomes"] / result["n"], index=list(teams), columns=OUTCOMES)
+
+def round_percentages(result, teams):
+    return pd.DataFrame(100 * result["rounds"] / result["n"], index=list(teams), columns=ROUNDS)
+
+def outcome_errors(result, teams):
+    return pd.DataFrame(standard_errors(result), index=list(teams), columns=OUTCOMES)
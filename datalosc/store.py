@@ -0,0 +1,224 @@
+import glob
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Frames are handed out as shallow copies, copy-on-write makes sure a page
+# writing into its copy never touches the cached data (default from pandas 3).
+if int(pd.__version__.split(".")[0]) == 2:
+    pd.set_option("mode.copy_on_write", True)
+
+ROOT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CSV_FOLDER = os.path.join(ROOT_FOLDER, "csv")
+
+SEASONS = {
+    "2025-2026": "25_26",
+    "2024-2025": "24_25",
+    "2023-2024": "23_24",
+}
+
+DEFAULT_BUDGET_MB = int(os.environ.get("DATALOSC_CACHE_MB", 1024))
+
+
+# ------------------------- Paths -------------------------
+def season_code(season):
+    return SEASONS.get(season, season)
+
+def season_path(season, *parts):
+    return os.path.join(CSV_FOLDER, f"csv{season_code(season)}", *parts)
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# ------------------------- Store -------------------------
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze(item)
+    return value
+
+def _sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values()) + sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(v) for v in value) + sys.getsizeof(value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+def _hand_out(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    return value
+
+
+class SeasonStore:
+    """Process-wide cache of the season files shared by every page and session.
+
+    Entries are keyed by absolute path (or by name for derived data), are
+    invalidated as soon as one of their files changes on disk (mtime or size)
+    and the least recently used ones are evicted once the memory budget is
+    exceeded.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = budget_mb * 1024 * 1024
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def read_csv(self, path, **kwargs):
+        path = os.path.abspath(path)
+        key = ("csv", path, repr(sorted(kwargs.items())))
+        return self._get(key, [path], lambda: pd.read_csv(path, **kwargs), missing_ok=False)
+
+    def derive(self, name, paths, builder):
+        """Cache `builder()` until one of `paths` changes (missing paths are allowed)."""
+        paths = [os.path.abspath(p) for p in paths]
+        key = ("derived", name, tuple(paths))
+        return self._get(key, paths, builder, missing_ok=True)
+
+    def invalidate(self, path=None):
+        path = os.path.abspath(path) if path else None
+        with self._lock:
+            for key in list(self._entries):
+                if path is None or path in self._entries[key][1]:
+                    self._drop(key)
+
+    def _get(self, key, paths, loader, missing_ok):
+        signature = self._signature(paths, missing_ok)
+        entry = self._lookup(key, signature)
+        if entry is not None:
+            return _hand_out(entry)
+
+        with self._key_lock(key):
+            entry = self._lookup(key, signature)
+            if entry is not None:
+                return _hand_out(entry)
+            value = _freeze(loader())
+            self._insert(key, paths, signature, value)
+        return _hand_out(value)
+
+    def _signature(self, paths, missing_ok):
+        signature = tuple(file_signature(p) for p in paths)
+        if not missing_ok:
+            for path, sig in zip(paths, signature):
+                if sig is None:
+                    raise FileNotFoundError(f"No such file: '{path}'")
+        return signature
+
+    def _lookup(self, key, signature):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != signature:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def _insert(self, key, paths, signature, value):
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (signature, paths, value, size)
+            self.size += size
+            while self.size > self.budget and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.size -= entry[3]
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+
+store = SeasonStore()
+
+
+# ------------------------- Loaders -------------------------
+def exists(season, *parts):
+    return os.path.exists(season_path(season, *parts))
+
+def load(season, *parts, **kwargs):
+    return store.read_csv(season_path(season, *parts), **kwargs)
+
+def load_concat(season, *files):
+    paths = [season_path(season, f) for f in files]
+    return store.derive(
+        "concat", paths,
+        lambda: pd.concat([pd.read_csv(p) for p in paths], ignore_index=True)
+    )
+
+def load_games(season, league):
+    return load(season, "Leagues Games", f"{league}_games.csv")
+
+def load_uefa_ranking(season, league):
+    return load(season, "UEFA Leagues", f"Ranking {league}.csv")
+
+def partition_index(df, keys):
+    """Row positions of every `keys` group, {key tuple: positions}, built with one groupby."""
+    return dict(df.groupby(keys, sort=False).indices)
+
+def take_partition(df, index, key):
+    rows = index.get(key)
+    return df.iloc[rows] if rows is not None else df.iloc[:0]
+
+def load_partitioned(season, keys, *parts):
+    """A season file and its partition index on `keys`."""
+    df = load(season, *parts)
+    return df, store.derive(("partitions", tuple(keys)), [season_path(season, *parts)], lambda: partition_index(df, keys))
+
+def _build_fixtures(paths):
+    frames = []
+    for path in paths:
+        games = pd.read_csv(path)
+        league = os.path.basename(path)[:-len("_games.csv")]
+        for team, opponent, home in [("Home Team", "Away Team", True), ("Away Team", "Home Team", False)]:
+            frames.append(pd.DataFrame({
+                "League": league,
+                "Game Week": games["Game Week"].astype(str),
+                "Team": games[team].astype(str),
+                "Opponent": games[opponent],
+                "Score": games["Score"],
+                "Venue": games["Venue"],
+                "Home": home,
+                "Row": games.index,
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["League", "Game Week", "Team", "Opponent", "Score", "Venue", "Home"])
+    fixtures = pd.concat(frames, ignore_index=True)
+    # A team plays at most once per game week, keep the first fixture in file order if not.
+    fixtures = fixtures.sort_values(["League", "Row"], kind="stable")
+    fixtures = fixtures.drop_duplicates(["League", "Game Week", "Team"])
+    return fixtures.drop(columns="Row").reset_index(drop=True)
+
+def load_fixtures(season):
+    """One row per (League, Game Week, Team) of every league of the season, with its opponent and score."""
+    paths = sorted(glob.glob(season_path(season, "Leagues Games", "*_games.csv")))
+    return store.derive("fixtures", paths, lambda: _build_fixtures(paths))
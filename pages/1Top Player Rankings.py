@@ -1,69 +1,69 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import os
-import re
 
-# --------- Fonctions utilitaires ---------
-def extract_matchday_num(j):
-    match = re.match(r"J(\d+)", str(j))
-    return int(match.group(1)) if match else -1
+import streamlit as st
+
+from datalosc.rankings import aggregate_players, load_rating_cube, profile_rating_cube
+from datalosc.ratings import ALL_PLAYERS, POSITION_GROUPS, TENSOR_FILES, default_profile, load_centile_tensor, tensor_path
+from datalosc.store import SEASONS
 
 # --------- Streamlit App ---------
 st.set_page_config(page_title="Top Player Rankings")
 st.sidebar.title("Select Parameters")
 
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
 
-season_code = None
-if selected_season == "2023-2024":
-    season_code = "23_24"
-elif selected_season == "2024-2025":
-    season_code = "24_25"
-elif selected_season == "2025-2026":
-    season_code = "25_26"
+cube = load_rating_cube(selected_season)
 
-if season_code:
-    path_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}", "players"))
-
-    df_scores_players = pd.read_csv(os.path.join(path_folder, "ratings/data_players.csv"))
-    df_scores_goalkeepers = pd.read_csv(os.path.join(path_folder, "ratings/data_goals.csv"))
-    df_scores = pd.concat([df_scores_players, df_scores_goalkeepers], ignore_index=True)
-
-positions = df_scores['General Position'].dropna().unique()
+positions = cube["categories"]["General Position"][0]
 all_positions = st.sidebar.checkbox("All positions", value=True)
 selected_positions = positions if all_positions else [st.sidebar.selectbox("Choose a position", positions)]
 
-leagues = sorted(df_scores["League"].dropna().unique())
+leagues = list(cube["leagues"])
 all_leagues = st.sidebar.checkbox("All leagues", value=True)
 selected_leagues = leagues if all_leagues else [st.sidebar.selectbox("Choose a league", leagues)]
 
-matchdays = sorted(df_scores["Game Week"].dropna().unique(), key=extract_matchday_num)
+matchdays = cube["weeks"]
 all_matchdays = st.sidebar.checkbox("All matchdays", value=True)
-selected_matchdays = matchdays if all_matchdays else [st.sidebar.selectbox("Choose a matchday", matchdays)]
+if all_matchdays or len(matchdays) < 2:
+    first_matchday, last_matchday = 0, len(matchdays) - 1
+else:
+    selected_range = st.sidebar.select_slider("Choose matchdays", matchdays, value=(matchdays[0], matchdays[0]))
+    first_matchday, last_matchday = matchdays.index(selected_range[0]), matchdays.index(selected_range[1])
 
 top_n = st.sidebar.slider("Number of players to display", 5, 100, 30)
 min_matches = st.sidebar.slider("Minimum matches played", 1, 50, 25)
 age_max = st.sidebar.slider("Maximum age", 15, 50, 50)
 
-df_scores_filtered = df_scores[
-    (df_scores["League"].isin(selected_leagues)) &
-    (df_scores["Game Week"].isin(selected_matchdays))
-]
-
-df_scores_filtered["Matches"] = 1
-df_agg = df_scores_filtered.groupby("Player", as_index=False).agg({
-    "Team": lambda x: sorted(list(set(x.dropna()))),
-    "League": lambda x: sorted(list(set(x.dropna()))),
-    "Position": lambda x: x.mode().iloc[0] if not x.mode().empty else None,
-    "General Position": lambda x: x.mode().iloc[0] if not x.mode().empty else None,
-    "Age": "max",
-    "Rating": "mean",
-    "Matches" : "count",
-    "Minutes": "sum",
-    "Nationality": "first"
-})
+# --------- Rating profile ---------
+# Every match is rated again with the weights below as soon as one differs
+# from the rating formulas, from the season's per-match centiles.
+profiles = {}
+for name, (goalkeepers, _, _) in TENSOR_FILES.items():
+    if not os.path.exists(tensor_path(selected_season, name)):
+        continue
+    groups = load_centile_tensor(selected_season, name)["groups"]
+    defaults = default_profile(groups)
+    profile = dict(defaults)
+    if goalkeepers:
+        position_groups = [("Goalkeeper", [ALL_PLAYERS])]
+    else:
+        position_groups = [(", ".join(group), [p for p in group if p in groups]) for group in POSITION_GROUPS]
+    for label, group in position_groups:
+        if not group:
+            continue
+        with st.sidebar.expander(f"{label} rating weights"):
+            weights = {
+                stat: st.slider(stat, 0.0, 10.0, float(weight), 0.5, key=f"{label}/{stat}")
+                for stat, weight in defaults[group[0]].items()
+            }
+        profile.update(dict.fromkeys(group, weights))
+    if profile != defaults:
+        profiles[name] = profile
+
+if profiles:
+    cube = profile_rating_cube(selected_season, profiles)
+
+df_agg = aggregate_players(cube, selected_leagues, first_matchday, last_matchday)
 
 df_agg = df_agg[df_agg["General Position"].isin(selected_positions)]
 df_avg = df_agg[(df_agg["Matches"] >= min_matches) & (df_agg["Age"] <= age_max)]
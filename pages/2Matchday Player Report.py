@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-import os
+
+from datalosc.facts import MATCH_KEYS, TEAM_TOTALS, load_match_partitions
+from datalosc.store import SEASONS, exists, load_games, load_partitioned, take_partition
 
 # ------------------------- Functions -------------------------
 def add_average(df):
@@ -26,14 +28,11 @@ def get_stats_infos(position):
                 'Yellow Cards', 'Red Cards', 'Second Yellow Card',	'Offsides', 'Aerials Won', 'Total Aerials']
     return list
 
-def prepare_player_stats(stats_df, ratings_df, exclude_cols=None):
+def prepare_player_stats(df_facts, position, exclude_cols=None):
     if exclude_cols is None:
         exclude_cols = []
-    df = stats_df.merge(
-        ratings_df[["Player", "Rating"]],
-        on="Player",
-        how="left"
-    )
+    source = "goals" if "GK" in position else "players"
+    df = df_facts.loc[df_facts["Source"] == source, get_stats_infos(position) + ["Rating"]]
     df = df.drop(columns=[col for col in exclude_cols if col in df.columns], errors='ignore')
     if "Player" in df.columns and "Rating" in df.columns:
         cols = df.columns.tolist()
@@ -43,17 +42,12 @@ def prepare_player_stats(stats_df, ratings_df, exclude_cols=None):
     df = df.set_index("Player")
     return df
 
-def team_stats(df_stats, team_name):
-    important_stats = [
-        'Expected Goals (xG)', 'Progressive Passes', 'Progressive Carries', 
-        'Key Passes', 'Passes into Final Third', 'Tackles Won', 'Interceptions', 'Aerials Won', 'Offsides',
-    ]
-    cols = [col for col in important_stats if col in df_stats.columns]
-    if not cols:
+def team_stats(df_facts, team_name):
+    cols = [col for col in TEAM_TOTALS.values() if col in df_facts.columns]
+    if df_facts.empty or not cols:
         return pd.DataFrame()
-    df_team = df_stats[cols].apply(pd.to_numeric, errors='coerce').fillna(0)
-    df_summary = df_team.sum().to_frame(name=team_name).round(2)
-    return df_summary
+    totals = df_facts[cols].iloc[0].rename({v: k for k, v in TEAM_TOTALS.items()})
+    return totals.to_frame(name=team_name)
 
 
 # ------------------------- Streamlit App -------------------------
@@ -65,43 +59,20 @@ st.title("Matchday Player Report")
 #)
 st.sidebar.title("Select Parameters")
 
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
-
-season = None
-if selected_season == "2023-2024":
-    season_code = "23_24"
-elif selected_season == "2024-2025":
-    season_code = "24_25"
-elif selected_season == "2025-2026":
-    season_code = "25_26"
-    
-base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}"))
-path_players = os.path.join(base_path, "players", "ratings", "data_players.csv")
-path_goalkeepers = os.path.join(base_path, "players", "ratings", "data_goals.csv")
-path_players_stats = os.path.join(base_path, "players", "clean", "data_players.csv")
-path_goalkeepers_stats = os.path.join(base_path, "players", "clean", "data_goals.csv")
-path_teams_stats = os.path.join(base_path, "players", "clean", "data_teams.csv")
-path_leagues = os.path.join(base_path, "Leagues Games")
-
-df_players = pd.read_csv(path_players)
-df_gk = pd.read_csv(path_goalkeepers)
-df_all = pd.concat([df_players, df_gk], ignore_index=True)
-
-df_players_stats = pd.read_csv(path_players_stats)
-df_gk_stats = pd.read_csv(path_goalkeepers_stats)
-df_players_stats = df_players_stats[get_stats_infos("")]
-df_gk_stats = df_gk_stats[get_stats_infos("GK")]
-
-available_leagues = df_players["League"].dropna().unique().tolist()
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
+
+df_facts, facts_index = load_match_partitions(selected_season)
+
+available_leagues = df_facts.loc[df_facts["Source"] == "players", "League"].dropna().unique().tolist()
 selected_leagues = st.sidebar.multiselect("League", available_leagues)
 
-if os.path.exists(path_teams_stats):
-    df_teams_stat = pd.read_csv(path_teams_stats)
+if exists(selected_season, "players/clean/data_teams.csv"):
+    df_teams_stat, teams_index = load_partitioned(selected_season, MATCH_KEYS, "players/clean/data_teams.csv")
 else:
-    df_teams_stat = pd.DataFrame()
+    df_teams_stat, teams_index = pd.DataFrame(), {}
 
 if selected_leagues:
-    df_games = pd.read_csv(f"{path_leagues}/{selected_leagues[0]}_games.csv")
+    df_games = load_games(selected_season, selected_leagues[0])
 
     available_weeks = sorted(df_games["Game Week"].dropna().unique(), key=lambda x: int(str(x).strip("J").strip()))
     selected_weeks = st.sidebar.multiselect("Game Week", available_weeks)
@@ -128,65 +99,34 @@ if selected_leagues:
                      f"**Referee:** {match_info.get('Referee', 'N/A')} | **Attendance:** {match_info.get('Attendance', 'N/A')} | "
                      f"**Venue:** {match_info.get('Venue', 'N/A')}")
             
-            df_home_ratings = df_all[
-                (df_all["Team"] == home_team) &
-                (df_all["Game Week"] == game_week) &
-                (df_all["League"] == selected_leagues[0])
-            ].drop(columns=["ID"], errors="ignore")
-
-            df_away_ratings = df_all[
-                (df_all["Team"] == away_team) &
-                (df_all["Game Week"] == game_week) &
-                (df_all["League"] == selected_leagues[0])
-            ].drop(columns=["ID"], errors="ignore")
-
-            df_home_stats = df_players_stats[
-                (df_players_stats["Team"] == home_team) &
-                (df_players_stats["Game Week"] == game_week) &
-                (df_players_stats["League"] == selected_leagues[0])
-            ].drop(columns=["ID"], errors="ignore")
-
-            df_away_stats = df_players_stats[
-                (df_players_stats["Team"] == away_team) &
-                (df_players_stats["Game Week"] == game_week) &
-                (df_players_stats["League"] == selected_leagues[0])
-            ].drop(columns=["ID"], errors="ignore")
-            
-            df_home_stats_gk = df_gk_stats[
-                (df_gk_stats["Team"] == home_team) &
-                (df_gk_stats["Game Week"] == game_week) &
-                (df_gk_stats["League"] == selected_leagues[0])
-            ].drop(columns=["ID"], errors="ignore")
-
-            df_away_stats_gk = df_gk_stats[
-                (df_gk_stats["Team"] == away_team) &
-                (df_gk_stats["Game Week"] == game_week) &
-                (df_gk_stats["League"] == selected_leagues[0])
-            ].drop(columns=["ID"], errors="ignore")
-            
+            home_key = (selected_leagues[0], game_week, home_team)
+            away_key = (selected_leagues[0], game_week, away_team)
+            df_home = take_partition(df_facts, facts_index, home_key)
+            df_away = take_partition(df_facts, facts_index, away_key)
+
+            df_match_teams = pd.DataFrame()
             if not df_teams_stat.empty:
-                df_teams_stat = df_teams_stat[
-                    ((df_teams_stat["Team"] == home_team) | (df_teams_stat["Team"] == away_team)) &
-                    (df_teams_stat["Game Week"] == game_week) &
-                    (df_teams_stat["League"] == selected_leagues[0])
-                ].drop(columns=["ID"], errors="ignore")
+                df_match_teams = pd.concat([
+                    take_partition(df_teams_stat, teams_index, home_key),
+                    take_partition(df_teams_stat, teams_index, away_key),
+                ]).sort_index().drop(columns=["ID"], errors="ignore")
             
             columns_excl = ['Game Week', 'Team', 'League']
 
-            df_home_players = prepare_player_stats(df_home_stats, df_home_ratings, exclude_cols=columns_excl)
-            df_away_players = prepare_player_stats(df_away_stats, df_away_ratings, exclude_cols=columns_excl)
-            df_home_gk = prepare_player_stats(df_home_stats_gk, df_home_ratings, exclude_cols=columns_excl)
-            df_away_gk = prepare_player_stats(df_away_stats_gk, df_away_ratings, exclude_cols=columns_excl)
+            df_home_players = prepare_player_stats(df_home, "", exclude_cols=columns_excl)
+            df_away_players = prepare_player_stats(df_away, "", exclude_cols=columns_excl)
+            df_home_gk = prepare_player_stats(df_home, "GK", exclude_cols=columns_excl)
+            df_away_gk = prepare_player_stats(df_away, "GK", exclude_cols=columns_excl)
 
-            df_home_summary = team_stats(df_home_stats, home_team)
-            df_away_summary = team_stats(df_away_stats, away_team)
+            df_home_summary = team_stats(df_home, home_team)
+            df_away_summary = team_stats(df_away, away_team)
             df_team_stats_bis = pd.concat([df_home_summary, df_away_summary], axis=1)
-            if not df_teams_stat.empty:
+            if not df_match_teams.empty:
                 columns_excl = ['Game Week', 'League']
-                df_teams_stat = df_teams_stat.drop(columns=[col for col in columns_excl if col in df_teams_stat.columns], errors='ignore')
+                df_match_teams = df_match_teams.drop(columns=[col for col in columns_excl if col in df_match_teams.columns], errors='ignore')
 
                 st.markdown("## Team Stats Overview")
-                df_team_stats = pd.concat([df_teams_stat.set_index("Team").T, df_team_stats_bis], axis=0)
+                df_team_stats = pd.concat([df_match_teams.set_index("Team").T, df_team_stats_bis], axis=0)
                 st.dataframe(df_team_stats)
             
             else:
@@ -2,7 +2,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import os
+
+from datalosc.cohorts import ADJUSTED_FILES, cohort_mask, cohort_table, load_cohort_index
+from datalosc.players import load_players
+from datalosc.store import SEASONS, load
 
 # ------------------------- Functions -------------------------
 def get_features_for_players(positions):
@@ -41,26 +44,22 @@ def get_features(positions):
     else:
         return get_features_for_players(positions)
 
-def get_df(path_folder, positions):
+def get_df(season, positions, cohort):
+    """Centiles of every player against the players of the `cohort` filters."""
     try:
-        file_name = "goals" if 'Goalkeeper' in positions else "players"
-        df_path = os.path.join(path_folder, f"centiles/data_{file_name}_centiles.csv")
-        df_radar = pd.read_csv(df_path)
-        df_radar.rename(columns={df_radar.columns[0]: "Player"}, inplace=True)
-        return df_radar
+        goalkeepers = 'Goalkeeper' in positions
+        df_adjusted = load_players(season, ADJUSTED_FILES[goalkeepers])
+        mask = cohort_mask(df_adjusted, **cohort)
+        return cohort_table(load_cohort_index(season, goalkeepers), df_adjusted, mask)
     except FileNotFoundError:
-        st.error(f"Data file not found in folder '{path_folder}'. Please check your selections and data.")
+        st.error(f"Data file not found for season '{season}'. Please check your selections and data.")
         return pd.DataFrame()
     
-def get_average_scores(positions, path_folder):
+def get_average_scores(positions, season):
     if 'Goalkeeper' in positions:
-        path = os.path.join(path_folder, "ratings/data_goals_average.csv")
+        return load(season, "players/ratings/data_goals_average.csv")
     else:
-        path = os.path.join(path_folder, "ratings/data_players_average.csv")
-
-    df = pd.read_csv(path)
-
-    return df
+        return load(season, "players/ratings/data_players_average.csv")
 
 def plot_radar(players_data, features, players):
     if len(features) < 3:
@@ -97,34 +96,28 @@ st.title("Player Performance Overview")
 #    "- View average ratings, percentiles, radar charts, and advanced metrics to analyze strengths and weaknesses."
 #    )
 
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
 
-season = None
-if selected_season == "2023-2024":
-    season_code = "23_24"
-elif selected_season == "2024-2025":
-    season_code = "24_25"
-elif selected_season == "2025-2026":
-    season_code = "25_26"
-
-if season_code:
-    path_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}", "players"))
-    
-    df_scores_players = pd.read_csv(os.path.join(path_folder, "ratings/data_players_average.csv"))
-    df_scores_goalkeepers = pd.read_csv(os.path.join(path_folder, "ratings/data_goals_average.csv"))
-    df_scores = pd.concat([df_scores_players, df_scores_goalkeepers], ignore_index=True)
+if selected_season:
+    df_scores = load_players(selected_season, "players/ratings/data_players_average.csv", "players/ratings/data_goals_average.csv")
     positions = st.sidebar.multiselect("Position", df_scores['General Position'].unique())
 
     if positions:
-        df_radar = get_df(path_folder, positions)
+        st.sidebar.subheader("Percentiles against")
+        league_options = sorted(set(df_scores['League'].dropna().astype(str).str.split(", ").explode()))
+        cohort = {
+            "leagues": st.sidebar.multiselect("Leagues (default: all)", league_options),
+            "max_age": st.sidebar.slider("Maximum age", 15, 50, 50),
+            "min_minutes": st.sidebar.slider("Minimum minutes played", 0, 4000, 0),
+        }
+        df_radar = get_df(selected_season, positions, cohort)
         if df_radar.empty:
             st.stop()
         else:
             selected_features = get_features(positions)
 
             file_name = f"data_goals_aggregated.csv" if 'Goalkeeper' in positions else f"data_players_aggregated.csv"
-            df_global_path = os.path.join(path_folder, f"centiles/{file_name}")
-            df_global = pd.read_csv(df_global_path)
+            df_global = load_players(selected_season, f"players/centiles/{file_name}")
             df_global = df_global[df_global['Matches'] > 0]
             df_global = df_global[df_global['General Position'].isin(positions)]
                 
@@ -137,13 +130,9 @@ if season_code:
             if selected_players:
                 df_global = df_global[df_global['Player'].isin(selected_players)]
                 df_global = df_global[df_global['General Position'].isin(positions)]
-                df_global = df_global.merge(
-                    df_scores,
-                    on=["Player", "Age", "Nationality"],
-                    how="left"
-                )
-                df_global = df_global.drop(columns=[col for col in df_global.columns if col.endswith("_x")])
-                df_global.columns = [col[:-2] if col.endswith('_y') else col for col in df_global.columns]
+                scores = df_scores.drop_duplicates("Player ID").set_index("Player ID")
+                scores = scores.drop(columns=["Player", "Age", "Nationality"])
+                df_global = df_global.drop(columns=scores.columns, errors="ignore").join(scores, on="Player ID")
 
                 df_global["Matches"] = df_global["Matches"].astype("Int64")
                 
@@ -169,9 +158,9 @@ if season_code:
                     
                 st.subheader("📈 Perfomance Metrics")
                 if 'Goalkeeper' in positions: 
-                    df_metrics = pd.read_csv(os.path.join(path_folder, "metrics", f"data_goals_metrics.csv"))
+                    df_metrics = load(selected_season, "players/metrics/data_goals_metrics.csv")
                 else:
-                    df_metrics = pd.read_csv(os.path.join(path_folder, "metrics", f"data_players_metrics.csv"))
+                    df_metrics = load(selected_season, "players/metrics/data_players_metrics.csv")
                 if not df_metrics.empty:
                     df_metrics = df_metrics[df_metrics['General Position'].isin(positions)]
                     df_metrics = df_metrics[df_metrics['Player'].isin(selected_players)]
@@ -183,8 +172,7 @@ if season_code:
 
                 for player in selected_players:
                     file_name = "data_goals_adjusted.csv" if 'Goalkeeper' in positions else "data_players_adjusted.csv"
-                    df_adj_path = os.path.join(path_folder, f"centiles/{file_name}")
-                    df_adj = pd.read_csv(df_adj_path)
+                    df_adj = load_players(selected_season, f"players/centiles/{file_name}")
 
                     stats_absolute = df_adj[
                         (df_adj["Player"] == player) &
@@ -202,8 +190,8 @@ if season_code:
 
                     df_merged = pd.merge(
                         stats_absolute,
-                        stats_percentiles,
-                        on=["Player", "Age", "Nationality"],
+                        stats_percentiles.drop(columns=["Player", "Nationality"]),
+                        on=["Player ID", "Age"],
                         suffixes=("_abs", "_pct")
                     )
 
@@ -1,6 +1,12 @@
 import streamlit as st
 import pandas as pd
-import os
+
+from datalosc.centiles import rank_centiles
+from datalosc.indices import (
+    DEFAULT_GLOBAL_WEIGHTS, GLOBAL_WEIGHTS, GOALKEEPER_INDICES, METRICS_FILES, PLAYER_INDICES, index_table, load_index_matrix
+)
+from datalosc.players import REGISTRY_FILE, load_players
+from datalosc.store import SEASONS, season_path, store
 
 # ---------------- Stats ----------------
 def get_player_stats():
@@ -19,33 +25,21 @@ st.sidebar.title("Select Parameters")
 #    "- Filter results, rank top players, and compare stats on a percentile scale."
 #)
 
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
-
-season = None
-if selected_season == "2023-2024":
-    season_code = "23_24"
-elif selected_season == "2024-2025":
-    season_code = "24_25"
-elif selected_season == "2025-2026":
-    season_code = "25_26"
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
 
-base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}", "players"))
 paths = {
-    "metrics_players": os.path.join(base_path, "metrics", f"data_players_metrics.csv"),
-    "metrics_gk": os.path.join(base_path, "metrics", f"data_goals_metrics.csv"),
-    "aggregated_players": os.path.join(base_path, "centiles", f"data_players_aggregated.csv"),
-    "aggregated_gk": os.path.join(base_path, "centiles", f"data_goals_aggregated.csv"),
-    "ratings_players": os.path.join(base_path, "ratings", "data_players.csv"),
-    "ratings_gk": os.path.join(base_path, "ratings", "data_goals.csv")
+    "centiles_players": METRICS_FILES[False][0],
+    "centiles_gk": METRICS_FILES[True][0],
+    "aggregated_players": "players/centiles/data_players_aggregated.csv",
+    "aggregated_gk": "players/centiles/data_goals_aggregated.csv",
+    "ratings_players": "players/ratings/data_players.csv",
+    "ratings_gk": "players/ratings/data_goals.csv"
 }
 
-df_players = pd.read_csv(paths["metrics_players"])
-df_gk = pd.read_csv(paths["metrics_gk"])
+df_players = load_players(selected_season, paths["centiles_players"])
+df_gk = load_players(selected_season, paths["centiles_gk"])
 
-df_notes = pd.concat([
-    pd.read_csv(paths["ratings_players"]),
-    pd.read_csv(paths["ratings_gk"])
-], ignore_index=True)
+df_notes = load_players(selected_season, paths["ratings_players"], paths["ratings_gk"])
 
 
 positions = st.sidebar.multiselect("Position", sorted(set(list(df_gk['General Position'].unique()) + list(df_players['General Position'].unique()))))
@@ -62,48 +56,66 @@ n = st.sidebar.slider("Number of top players to display", 5, 100, 30)
 min_minutes = st.sidebar.slider("Minimum minutes played", 0, 4000, 2000)
 age_max = st.sidebar.slider("Maximum age", 15, 50, 50)
 
-if "Goalkeeper" in positions:
-    df_all = df_gk
-else: 
-    df_all = df_players
+# ---------------- Index weights ----------------
+def weight_sliders(title, weights, key):
+    with st.sidebar.expander(title):
+        return {col: st.slider(col, 0, 100, weight, key=f"{key}/{col}") for col, weight in weights.items()}
+
+# Goalkeeper indices only when goalkeepers alone are selected, as for the stats list.
+goalkeepers = is_only_gk
+indices = {name: dict(weights) for name, weights in (GOALKEEPER_INDICES if goalkeepers else PLAYER_INDICES).items()}
+global_weights = None if goalkeepers else dict(GLOBAL_WEIGHTS)
+if stat == "Global Index":
+    for position in [position for position in positions if position != "Goalkeeper"]:
+        global_weights[position] = weight_sliders(
+            f"{position} weights", GLOBAL_WEIGHTS.get(position, DEFAULT_GLOBAL_WEIGHTS), f"Global/{position}"
+        )
+else:
+    indices[stat] = weight_sliders(f"{stat} weights", indices[stat], stat)
+
+# Indices recomputed from the centile matrix with the weights above.
+df_centiles = df_gk if goalkeepers else df_players
+df_all = index_table(load_index_matrix(selected_season, goalkeepers), indices, global_weights)
+df_all["Player ID"] = df_centiles["Player ID"].to_numpy()
 
 df_filtered = df_all[(df_all["General Position"].isin(positions)) & (df_all[stat].notna())].copy()
 df_filtered = df_filtered[df_filtered["Minutes"] >= min_minutes]
 df_filtered["Age"] = df_filtered["Age"].astype(str).str.split("-").str[0].astype(int)
 df_filtered = df_filtered[df_filtered["Age"] <= age_max]
 
-df_grouped = df_filtered[["Player", stat, "Minutes", "Age", "Nationality"]].copy()
+df_grouped = df_filtered[["Player ID", "Player", stat, "Minutes", "Age", "Nationality"]].copy()
 
-if not df_notes.empty:
-    df_rating = df_notes.groupby("Player", as_index=False)["Rating"].mean().rename(columns={"Rating": "Average Rating"})
-    df_rating["Average Rating"] = df_rating["Average Rating"].round(2)
-    most_common_pos = df_notes.groupby('Player')['Position'].agg(lambda x: x.mode().iloc[0] if not x.mode().empty else None)
-    df_rating = df_rating.merge(most_common_pos, on='Player', how='left')
+# Percentile of the index among the filtered players only.
+df_grouped["Cohort Percentile"] = rank_centiles(df_filtered[[stat]].to_numpy())[:, 0].astype(int)
 
-    df_club = df_notes.groupby("Player")["Team"].agg(lambda x: ", ".join(sorted(set(x)))).reset_index()
-    df_league = df_notes.groupby("Player")["League"].agg(lambda x: ", ".join(sorted(set(x)))).reset_index()
+def rating_summary(df_notes):
+    notes = df_notes.groupby("Player ID")
+    return pd.DataFrame({
+        "Average Rating": notes["Rating"].mean().round(2),
+        "Position": notes["Position"].agg(lambda x: x.mode().iloc[0] if not x.mode().empty else None),
+        "Team": notes["Team"].agg(lambda x: ", ".join(sorted(set(x)))),
+        "League": notes["League"].agg(lambda x: ", ".join(sorted(set(x)))),
+    })
 
-    df_final = df_grouped.merge(df_rating, on="Player", how="left") \
-                         .merge(df_club, on="Player", how="left") \
-                         .merge(df_league, on="Player", how="left")
+if not df_notes.empty:
+    # Built once per ratings files, so moving a weight slider only recomputes the indices.
+    ratings_paths = [season_path(selected_season, paths[name]) for name in ("ratings_players", "ratings_gk")]
+    df_rating = store.derive("rating summary", ratings_paths + [REGISTRY_FILE], lambda: rating_summary(df_notes))
 else:
-    df_rating = pd.DataFrame(columns=["Player"])
-    df_aggregated_players = pd.read_csv(paths["aggregated_players"])
-    df_aggregated_gk = pd.read_csv(paths["aggregated_gk"])
-    df_aggregated_gk["General Position"] = "Goalkeeper"
+    df_aggregated_players = load_players(selected_season, paths["aggregated_players"])
+    df_aggregated_gk = load_players(selected_season, paths["aggregated_gk"])
     df_aggregated_all = pd.concat([df_aggregated_players, df_aggregated_gk], ignore_index=True)
-    df_club = df_aggregated_all[["Player", "Team"]].drop_duplicates()
+    df_rating = df_aggregated_all.drop_duplicates("Player ID").set_index("Player ID")[["Team"]]
 
-    df_final = df_grouped.merge(df_rating, on="Player", how="left") \
-                         .merge(df_club, on="Player", how="left")
+df_final = df_grouped.join(df_rating, on="Player ID")
 
 df_final = df_final.sort_values(by=stat, ascending=False).head(n)
 
-columns_to_display = ["Player", stat, "Age", "Nationality", "Minutes"]
+columns_to_display = ["Player", stat, "Cohort Percentile", "Age", "Nationality", "Minutes"]
 if "Average Rating" in df_final.columns:
-    columns_to_display = ["Player", stat, "Average Rating", "Age", "Nationality", "Minutes"]
+    columns_to_display = ["Player", stat, "Cohort Percentile", "Average Rating", "Age", "Nationality", "Minutes"]
 if "Position" in df_final.columns:
-    columns_to_display = ["Player", stat, "Average Rating", "Position", "Age", "Nationality", "Minutes"]
+    columns_to_display = ["Player", stat, "Cohort Percentile", "Average Rating", "Position", "Age", "Nationality", "Minutes"]
 if "Team" in df_final.columns:
     df_final.rename(columns={"Team": "Team(s)"}, inplace=True)
     columns_to_display.append("Team(s)")
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import os
+
+from datalosc.store import SEASONS, load
 
 # ------------------------- Functions -------------------------
 def get_features():
@@ -11,17 +12,14 @@ def get_features():
         'Aerial Duels Won', 'Possession', 'Clean Sheets', 'Goals Against', 'Efficiency GK'
     ]
 
-def load_centile_data(path_folder):
-    path = os.path.join(path_folder, f"teams/Teams_centiles.csv")
-    return pd.read_csv(path)
+def load_centile_data(season):
+    return load(season, "teams/Teams_centiles.csv")
 
-def load_adjusted_data(path_folder):
-    path = os.path.join(path_folder, f"teams/Teams_adjusted.csv")
-    return pd.read_csv(path)
+def load_adjusted_data(season):
+    return load(season, "teams/Teams_adjusted.csv")
 
-def load_aggregated_data(path_folder):
-    path = os.path.join(path_folder, f"teams/Teams_aggregated.csv")
-    return pd.read_csv(path)
+def load_aggregated_data(season):
+    return load(season, "teams/Teams_aggregated.csv")
 
 def plot_team_radar(df, features, selected_teams):
     angles = np.linspace(0, 2 * np.pi, len(features), endpoint=False).tolist()
@@ -48,21 +46,11 @@ st.title("Team Performances")
 #    "- View percentiles, adjusted stats, and head-to-head comparisons for selected teams."
 #)
 st.sidebar.title("Select Parameters")
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
-
-season = None
-if selected_season == "2023-2024":
-    season_code = "23_24"
-elif selected_season == "2024-2025":
-    season_code = "24_25"
-elif selected_season == "2025-2026":
-    season_code = "25_26"
-    
-path_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}"))
-
-df_centiles = load_centile_data(path_folder)
-df_adjusted = load_adjusted_data(path_folder)
-df_agg = load_aggregated_data(path_folder)
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
+
+df_centiles = load_centile_data(selected_season)
+df_adjusted = load_adjusted_data(selected_season)
+df_agg = load_aggregated_data(selected_season)
 
 df_centiles = df_centiles[df_centiles['Matches Played'] > 0].copy()
 df_adjusted = df_adjusted[df_adjusted['Matches Played'] > 0].copy()
@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
-import os
+
+from datalosc.facts import load_match_facts
+from datalosc.store import SEASONS
 
 # ------------------------- Functions -------------------------
 def get_player_stats():
@@ -35,23 +36,11 @@ def get_goalkeeper_stats():
         "Sweeper Actions", "Defensive Actions Outside Penalty Area",
     ]
 
-def get_opponent_score(row):
-    league = row["League"]
-    gameweek = row["Game Week"]
-    team = row["Team"]
-    match_df = games.get(league)
-    
-    if match_df is None:
-        return pd.Series(["Unknown", "N/A"])
-
-    match = match_df[match_df["Game Week"] == gameweek]
-    for _, m in match.iterrows():
-        if m["Home Team"] == team:
-            return pd.Series([m["Away Team"], m["Score"]])
-        elif m["Away Team"] == team:
-            return pd.Series([m["Home Team"], m["Score"]])
-    
-    return pd.Series(["Unknown", "N/A"])
+def fill_unknown_fixtures(df):
+    unknown = df["Opponent"].isna()
+    df.loc[unknown, "Opponent"] = "Unknown"
+    df.loc[unknown, "Score"] = "N/A"
+    return df
 
 # ------------------------- Streamlit App -------------------------
 st.set_page_config(page_title="Top Match Performances")
@@ -63,46 +52,9 @@ st.title("Top Match Performances")
 
 st.sidebar.title("Select Parameters")
 
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
-
-season = None
-if selected_season == "2023-2024":
-    season_code = "23_24"
-elif selected_season == "2024-2025":
-    season_code = "24_25"
-elif selected_season == "2025-2026":
-    season_code = "25_26"
-
-path_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}"))
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
 
-paths = {
-    "games": os.path.join(path_folder, "Leagues Games", "{}_games.csv"),
-    "clean_players": os.path.join(path_folder, "players", "clean", "data_players.csv"),
-    "clean_goals": os.path.join(path_folder, "players", "clean", "data_goals.csv"),
-    "ratings_players": os.path.join(path_folder, "players", "ratings", "data_players.csv"),
-    "ratings_goals": os.path.join(path_folder, "players", "ratings", "data_goals.csv"),
-}
-
-df_players = pd.read_csv(paths["clean_players"])
-df_goalkeepers = pd.read_csv(paths["clean_goals"])
-df_ratings_players = pd.read_csv(paths["ratings_players"])
-df_ratings_goalkeepers = pd.read_csv(paths["ratings_goals"])
-df_all = pd.concat([df_players, df_goalkeepers], ignore_index=True)
-df_ratings = pd.concat([df_ratings_players, df_ratings_goalkeepers], ignore_index=True)
-
-for col in ["Player", "Game Week", "Team", "League"]:
-    df_all[col] = df_all[col].astype(str)
-    df_ratings[col] = df_ratings[col].astype(str)
-
-df_ratings = df_ratings.drop_duplicates(subset=["Player", "Game Week", "Team", "League"])
-df_ratings_filtered = df_ratings[["Player", "Game Week", "Team", "League", "Rating"]]
-
-df = pd.merge(
-    df_all,                      
-    df_ratings_filtered,        
-    on=["Player", "Game Week", "Team", "League"],
-    how="left"
-)
+df = load_match_facts(selected_season)
 
 positions = st.sidebar.multiselect("Position", df["General Position"].unique())
 if not positions:
@@ -127,15 +79,8 @@ df = df[df["League"].isin(selected_leagues)]
 if stat and stat in df.columns:
     df = df[df[stat].notna()]
 
-games = {}
-for lg in df["League"].unique():
-    try:
-        games[lg] = pd.read_csv(paths["games"].format(lg))
-    except FileNotFoundError:
-        continue
-
 if positions and stat and selected_leagues:
-    df[["Opponent", "Score"]] = df.apply(get_opponent_score, axis=1)
+    df = fill_unknown_fixtures(df)
 
     df = df[df[stat].notna() & df["Score"].notna()]
     
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-import os
+
+from datalosc.players import load_players
+from datalosc.store import SEASONS
 
 # ----------------------- Stats ------------------------
 def get_player_stats():
@@ -45,27 +47,19 @@ st.title("Top Season Performances")
 # ----------------------- Sidebar ------------------------
 st.sidebar.title("Select Parameters")
 
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
 
-if selected_season == "2023-2024":
-    season_code = "23_24"
-elif selected_season == "2024-2025":
-    season_code = "24_25"
-elif selected_season == "2025-2026":
-    season_code = "25_26"
-else:
-    season_code = None
+if selected_season not in SEASONS:
     st.error("Invalid season selected.")
     st.stop()
 
-base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}", "players"))
 paths = {
-    "adjusted_players": os.path.join(base_path, "centiles", f"data_players_adjusted.csv"),
-    "adjusted_gk": os.path.join(base_path, "centiles", f"data_goals_adjusted.csv"),
-    "aggregated_players": os.path.join(base_path, "centiles", f"data_players_aggregated.csv"),
-    "aggregated_gk": os.path.join(base_path, "centiles", f"data_goals_aggregated.csv"),
-    "data_players_average": os.path.join(base_path, "ratings", "data_players_average.csv"),
-    "data_goals_average": os.path.join(base_path, "ratings", "data_goals_average.csv")
+    "adjusted_players": "players/centiles/data_players_adjusted.csv",
+    "adjusted_gk": "players/centiles/data_goals_adjusted.csv",
+    "aggregated_players": "players/centiles/data_players_aggregated.csv",
+    "aggregated_gk": "players/centiles/data_goals_aggregated.csv",
+    "data_players_average": "players/ratings/data_players_average.csv",
+    "data_goals_average": "players/ratings/data_goals_average.csv"
 }
 
 per_90 = st.sidebar.checkbox("Per 90 min?", value=True)
@@ -73,11 +67,11 @@ per_90 = st.sidebar.checkbox("Per 90 min?", value=True)
 # ----------------------- Load Data ------------------------
 try:
     if per_90:
-        df_players = pd.read_csv(paths["adjusted_players"])
-        df_gk = pd.read_csv(paths["adjusted_gk"])
+        df_players = load_players(selected_season, paths["adjusted_players"])
+        df_gk = load_players(selected_season, paths["adjusted_gk"])
     else:
-        df_players = pd.read_csv(paths["aggregated_players"])
-        df_gk = pd.read_csv(paths["aggregated_gk"])
+        df_players = load_players(selected_season, paths["aggregated_players"])
+        df_gk = load_players(selected_season, paths["aggregated_gk"])
 except Exception as e:
     st.error(f"Error loading data files: {e}")
     st.stop()
@@ -85,10 +79,7 @@ except Exception as e:
 df_gk["General Position"] = "Goalkeeper"
 df_all = pd.concat([df_players, df_gk], ignore_index=True)
 
-df_rating = pd.concat([
-        pd.read_csv(paths["data_players_average"]),
-        pd.read_csv(paths["data_goals_average"])
-    ], ignore_index=True)
+df_rating = load_players(selected_season, paths["data_players_average"], paths["data_goals_average"])
     
 positions = st.sidebar.multiselect("Position", df_rating['General Position'].unique())
 if not positions:
@@ -107,7 +98,8 @@ df_filtered["Age"] = df_filtered["Age"].astype(str).str.split("-").str[0].astype
 df_filtered = df_filtered[df_filtered["Age"] <= age_max]
 df_filtered = df_filtered[df_filtered["Minutes"] >= min_minutes]
 
-df_grouped = df_filtered.groupby("Player", as_index=False).agg({
+df_grouped = df_filtered.groupby("Player ID", as_index=False).agg({
+    "Player": "first",
     stat: "sum",
     "Minutes": "sum",
     "Age": "first", 
@@ -119,38 +111,13 @@ df_grouped = df_grouped[df_grouped["Minutes"] >= min_minutes]
 
 # ----------------------- Join Data ------------------------
 if not df_rating.empty:
-    df_total = df_grouped.merge(df_rating, on=["Player", "Nationality", "Age"], how="left") \
-                     .merge(df_all, on=["Player", "Nationality", "Age"], how="left") 
-    
-    df_total = df_total.rename(columns={
-        "Most Common Position": "Position",
-        "Team": "Team(s)",
-        "Minutes": "Minutes Played",
-        "League": "League(s)"
-    })
-
+    details = df_rating.drop_duplicates("Player ID").set_index("Player ID")
+    details = details[["Average Rating", "Position", "Team", "League"]]
 else:
-    df_rating = pd.DataFrame(columns=["Player", "Average Rating"])
-    try:
-        df_aggregated_players = pd.read_csv(paths["aggregated_players"])
-        df_aggregated_gk = pd.read_csv(paths["aggregated_gk"])
-    except Exception as e:
-        st.error(f"Error loading aggregated data: {e}")
-        st.stop()
-
-    df_aggregated_gk["General Position"] = "Goalkeeper"
-    df_aggregated_all = pd.concat([df_aggregated_players, df_aggregated_gk], ignore_index=True)
-    df_club = df_aggregated_all[["Player", "Team"]].drop_duplicates()
-    
-    df_total = df_grouped.merge(df_rating, on="Player", how="left") \
-                        .merge(df_club, on="Player", how="left") \
-                        .merge(df_all, on="Player", how="left")
+    details = df_all.drop_duplicates("Player ID").set_index("Player ID")[["Position", "Team", "League"]]
+    details["Average Rating"] = float("nan")
 
-cols_x = [col for col in df_total.columns if col.endswith('_x')]
-rename_dict = {col: col.replace('_x', '') for col in cols_x}
-df_total = df_total.rename(columns=rename_dict)
-df_total = df_total.loc[:, ~df_total.columns.duplicated()]
-df_total = df_total.drop(columns=[col for col in df_total.columns if '_y' in col or '_x' in col], errors='ignore')
+df_total = df_grouped.join(details, on="Player ID")
 
 df_total = df_total.sort_values(by=stat, ascending=False).head(n)
 
@@ -169,8 +136,7 @@ df_display["League(s)"] = df_display["League(s)"].apply(lambda x: ", ".join(x) i
 
 if "Goalkeeper" in positions:
     df_display["Minutes Played"] = df_display["Minutes Played"].astype(int)
-    
-df_display = df_display.loc[:, ~df_display.columns.duplicated()]
+
 st.dataframe(df_display.set_index("Player"), use_container_width=True)
 
 
@@ -2,52 +2,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from collections import defaultdict
-import os
+
+from datalosc.season_simulation import DOMESTIC_LEAGUES, season_probabilities, simulate_rest_of_season
+from datalosc.simulation import compute_standing
+from datalosc.store import SEASONS, load_games
 
 # ------------------------- Functions -------------------------
-def load_matches_data(path_folder, selected_league):
-    path = os.path.join(path_folder, f"Leagues Games/{selected_league}_games.csv")
-    return pd.read_csv(path)
-
-def compute_points(Matches, matches_played, no_others_matchs):
-    df = Matches[:matches_played * no_others_matchs].dropna(subset=["Score"])
-    teams = sorted(set(Matches["Home Team"]).union(set(Matches["Away Team"])))
-    points = {team: 0 for team in teams}
-    goals_for = {team: 0 for team in teams}
-    goals_against = {team: 0 for team in teams}
-    
-    if not df.empty:
-        for _, row in df.iterrows():
-            home = row["Home Team"]
-            away = row["Away Team"]
-            score = row["Score"]
-            try:
-                home_goals, away_goals = [int(x.strip()) for x in score.replace('–', '-').split('-')]
-            except:
-                continue
-
-            goals_for[home] += home_goals
-            goals_against[home] += away_goals
-            goals_for[away] += away_goals
-            goals_against[away] += home_goals
-
-            if home_goals > away_goals:
-                points[home] += 3
-            elif home_goals < away_goals:
-                points[away] += 3
-            else:
-                points[home] += 1
-                points[away] += 1
-
-    df_points = pd.DataFrame({
-        "Team": list(points.keys()),
-        "Pts": list(points.values()),
-        "Goals": [goals_for[t] for t in points.keys()],
-        "Goals Against": [goals_against[t] for t in points.keys()],
-    })
-    
-    df_points["Goal Diff"] = df_points["Goals"] - df_points["Goals Against"]
-    return df_points
+def load_matches_data(season, selected_league):
+    return load_games(season, selected_league)
 
 def compute_average_opponent_rank(Matches, Standing, matches_played, no_others_matchs):
     df_matches_played = Matches[:matches_played * no_others_matchs].dropna(subset=["Score"])
@@ -95,16 +57,13 @@ st.set_page_config(page_title="Leagues Summary", layout="wide")
 st.title("Leagues Summary")
 
 st.sidebar.title("Parameters")
-selected_season = st.sidebar.selectbox("Season", ["2025-2026", "2024-2025", "2023-2024"], index=0)
+selected_season = st.sidebar.selectbox("Season", list(SEASONS), index=0)
 selected_league = st.sidebar.selectbox("League", ["UEFA Champions League", "UEFA Europa League", "UEFA Europa Conference League", "Italian Serie A", "French Ligue 1", "German Bundesliga", "English Premier League", "Spanish La Liga"], index=None)
 
-season_code = {"2023-2024":"23_24","2024-2025":"24_25","2025-2026":"25_26"}[selected_season]
-path_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "csv", f"csv{season_code}"))
-
 if not selected_league:
     st.stop()
     
-Matches = load_matches_data(path_folder, selected_league)
+Matches = load_matches_data(selected_season, selected_league)
 
 league_info = {
     "UEFA Champions League": {"matches": 8, "opponents": 36},
@@ -125,7 +84,7 @@ selected_matches_played = st.sidebar.selectbox("Matches Played", range(no_matche
 if selected_matches_played is None:
     st.stop()
     
-Standing = compute_points(Matches, selected_matches_played, no_others_matchs)
+Standing = compute_standing(Matches, selected_matches_played, no_others_matchs)
 
 # ------------------------- Visualization -------------------------
 st.subheader("Standing")
@@ -138,6 +97,25 @@ Standing.index = Standing.index + 1
 Standing.index.name = "Rank"
 st.table(Standing)
 
+# ------------------------- Rest-of-Season Simulation -------------------------
+if selected_league in DOMESTIC_LEAGUES:
+    st.subheader("Rest-of-Season Simulation")
+    N = st.sidebar.select_slider("Simulations", [10**4, 10**5, 10**6], value=10**5, format_func="{:,}".format)
+    seed = st.sidebar.number_input("Seed", min_value=0, value=0, step=1)
+
+    with st.spinner("Simulating the rest of the season..."):
+        Results = simulate_rest_of_season(Matches, Standing, selected_matches_played, no_others_matchs, N, seed=int(seed))
+
+    df_simulation = season_probabilities(Results, Standing["Team"], **DOMESTIC_LEAGUES[selected_league])
+    df_simulation = df_simulation.sort_values(by=["Expected Position", "Expected Points"], ascending=[True, False])
+    df_simulation = df_simulation.rename_axis("Team").reset_index()
+    for column in df_simulation.columns[1:]:
+        df_simulation[column] = df_simulation[column].map("{:.2f}".format)
+    df_simulation.index = df_simulation.index + 1
+    df_simulation.index.name = "Rank"
+    st.caption(f"{Results['n']:,} simulated seasons, scores drawn from each team's attack and defence rates")
+    st.table(df_simulation)
+
 # ------------------------- Average Opponent Rank -------------------------
 st.subheader("Average Opponent Rank")
 